@@ -15,10 +15,19 @@ logger_level = CM.VLog.DEBUG
 allows_known_errors = False
 show_cov = True
 analyze_outps = False
+rand_cex = False  #create cex configs without a solver (see Dom.gen_configs_cex)
+use_bdd = False  #check interactions using BddDB instead of z3
+#limits of each run of the prog (see get_cov.run_single), None: no limit
+timeout = None  #wall-clock secs
+cpu_limit = None  #cpu secs
+mem_limit = None  #MB
+timeout_sid = "@timeout"  #covered by configs whose runs exceed the limits
 
 #Data Structures
+#sids are strings, or their ids (ints) in a SidTable during a run
+is_sid = lambda sid: isinstance(sid, (str, int))
 is_cov = lambda cov: (isinstance(cov, (set, frozenset)) and
-                      all(isinstance(c, str) for c in cov))
+                      all(is_sid(c) for c in cov))
 def str_of_cov(cov):
     """
     >>> assert str_of_cov(set("L2 L1 L3".split())) == '(3) L1,L2,L3'
@@ -30,7 +39,6 @@ def str_of_cov(cov):
         s = "{} {}".format(s, ','.join(sorted(cov)))
     return s
 
-
 is_setting = lambda (k, v): isinstance(k, str) and isinstance(v, str)
 def str_of_setting((k, v)):
     """
@@ -130,17 +138,17 @@ class Dom(OrderedDict):
     x=2 y=1 z=0 w=a
     x=1 y=1 z=0 w=b
     x=2 y=1 z=1 w=a
-    x=2 y=1 z=2 w=a
     x=1 y=1 z=0 w=a
+    x=1 y=1 z=0 w=c
 
     >>> random.seed(0)
     >>> configs = dom.gen_configs_rand_smt(5, z3db, configs+configs)
     >>> print "\\n".join(map(str, configs))
-    x=1 y=1 z=0 w=c
-    x=2 y=1 z=0 w=b
     x=2 y=1 z=0 w=c
-    x=2 y=1 z=2 w=c
-    x=2 y=1 z=2 w=b
+    x=1 y=1 z=2 w=a
+    x=2 y=1 z=2 w=a
+    x=1 y=1 z=1 w=a
+    x=1 y=1 z=1 w=c
 
     >>> new_configs = dom.gen_configs_rand_smt(dom.siz, z3db, configs)
     >>> assert len(new_configs) == dom.siz - len(configs), (len(new_configs), dom.siz, len(configs))
@@ -153,9 +161,11 @@ class Dom(OrderedDict):
 
     """
     def __init__(self, dom):
+        global _config_tables
         OrderedDict.__init__(self, dom)
         
         assert self and all(is_csetting(s) for s in self.iteritems()), self
+        _config_tables = _ConfigTables()  #for the configs of this dom
 
     def __str__(self):
         """
@@ -257,6 +267,55 @@ class Dom(OrderedDict):
             configs = [_f(m) for m in models]
             return configs
         
+    def config_of_solver(self, solver, config_cls):
+        """
+        Ret a config from a model of solver or None if unsat
+        """
+        assert isinstance(solver, z3.Solver), solver
+        assert config_cls, config_cls
+
+        stat = solver.check()
+        assert stat != z3.unknown, stat  #z3 cannot solve this
+        if stat == z3.unsat:
+            return None
+
+        m = solver.model()
+        m = dict((str(v), str(m[v])) for v in m)
+        return self.config_of_model(m, config_cls)
+
+    def models_enum(self, z3db):
+        """
+        Ret a model enumerator over the options of z3db.
+        Options not constrained by a model get random values.
+        """
+        assert isinstance(z3db, Z3DB)
+        
+        def _f(v):
+            k = str(v)
+            return z3db[k][1][random.choice(list(self[k]))]
+        
+        vs = [z3db[k][0] for k in self]
+        return z3util.ModelEnum(vs=vs, complete_f=_f)
+
+    def gen_configs_enum(self, menum, k, config_cls):
+        """
+        Return at most k new configs from menum (see models_enum)
+        """
+        assert isinstance(menum, z3util.ModelEnum), menum
+        assert k > 0, k
+        assert config_cls, config_cls
+
+        models = menum.get(k)
+        assert models is not None, models  #z3 cannot solve this
+        if not models:
+            return []
+
+        configs = []
+        for m in models:
+            m = dict((str(v), str(val)) for v, val in m)
+            configs.append(config_cls((k_, m[k_]) for k_ in self))
+        return configs
+        
     def gen_configs_exprs(self, yexprs, nexprs, k, config_cls):
         """
         Return a config satisfying yexprs but not nexprs
@@ -286,32 +345,22 @@ class Dom(OrderedDict):
         if config_cls is None:
             config_cls = Config
 
-        exprs = []
-            
+        menum = self.models_enum(z3db)
         existing_configs = set(existing_configs)
-        if existing_configs:
-            exprs = [c.z3expr(z3db) for c in existing_configs]
-            nexpr = z3util.myOr(exprs)
-            configs = self.gen_configs_exprs([], [nexpr], 1, config_cls)
-            if not configs:
-                return []
-            else:
-                config = configs[0]
-        else:
+        for c in existing_configs:
+            menum.add(z3.Not(c.z3expr(z3db)))
+            
+        configs = []
+        if not existing_configs:
             configs = self.gen_configs_rand(1, config_cls)
             assert len(configs) == 1, configs
-            config = configs[0]
-
-        for _ in range(rand_n - 1):
-            exprs.append(config.z3expr(z3db))
-            nexpr = z3util.myOr(exprs)
-            configs_ = self.gen_configs_exprs([], [nexpr], 1, config_cls)
-            if not configs_:
-                break
-            config = configs_[0]            
-            configs.append(config)
+            menum.add(z3.Not(configs[0].z3expr(z3db)))
+
+        if rand_n > len(configs):
+            configs.extend(self.gen_configs_enum(
+                menum, rand_n - len(configs), config_cls))
             
-        return configs    
+        return configs
         
 class Z3DB(dict):
     def __init__(self, dom):
@@ -325,6 +374,7 @@ class Z3DB(dict):
             rs.append(('typ', ttyp))
             db[k] = (z3.Const(k, ttyp), dict(rs))
         dict.__init__(self, db)
+        self._dom = dom
         
         
     @property
@@ -344,6 +394,52 @@ class Z3DB(dict):
             self._solver = z3.Solver()
             return self._solver
 
+    @property
+    def bdddb(self):
+        """
+        Decision diagrams of the same dom, see BddDB
+        """
+        try:
+            return self._bdddb
+        except AttributeError:
+            self._bdddb = BddDB(self._dom)
+            return self._bdddb
+
+    def block_solver(self, configs):
+        """
+        Ret an incremental solver whose models differ from all configs.
+        The blocking clause of each config is added once and kept,
+        so configs is expected to grow between calls
+        (the solver is rebuilt if configs misses a blocked config).
+        Use push/pop to check other constraints.
+
+        >>> dom = Dom([('a', frozenset(['0', '1'])), ('b', frozenset(['0', '1']))])
+        >>> z3db = Z3DB(dom)
+        >>> configs = [Config([('a', '0'), ('b', '0')]), Config([('a', '0'), ('b', '1')])]
+        >>> solver = z3db.block_solver(configs)
+        >>> solver.push()
+        >>> solver.add(z3db.expr_of_dict(HDict([('a', '0')])))
+        >>> print solver.check()
+        unsat
+        >>> solver.pop()
+        >>> print dom.config_of_solver(solver, Config)
+        a=1 b=0
+        >>> assert z3db.block_solver(configs[:1]) is not solver
+        """
+        try:
+            solver, blocked = self._block_solver
+            if not all(c in configs for c in blocked):
+                raise AttributeError
+        except AttributeError:
+            solver, blocked = z3.Solver(), set()
+            self._block_solver = (solver, blocked)
+
+        for c in configs:
+            if c not in blocked:
+                solver.add(z3.Not(c.z3expr(self)))
+                blocked.add(c)
+        return solver
+        
     def add(self, k, v):
         assert self.maybe_expr(v), v 
         self.cache[k] = v
@@ -388,10 +484,249 @@ class Z3DB(dict):
     def maybe_expr(expr):
         #not None => z3expr
         return expr is None or z3.is_expr(expr)
-    
 
-class Config(HDict):
+
+class BddDB(object):
+    """
+    Reduced ordered (multi-valued) decision diagrams over the options
+    of dom, i.e., a node tests an option and has a child per value.
+    Nodes are hash-consed (ints, FALSE=0 and TRUE=1), so equivalent
+    formulas are the same node and checking implication, equivalence
+    or satisfiability is cheap.  Like Z3DB, formulas of empty dicts
+    are None (true).
+
+    >>> dom = Dom([('a', frozenset(['0','1'])), ('b', frozenset(['0','1','2']))])
+    >>> bdddb = BddDB(dom)
+    >>> f = bdddb.expr_of_dict_dict(HDict([('b', frozenset(['1','2'])), ('a', frozenset(['1']))]), is_and=True)
+    >>> g = bdddb.expr_of_dict_dict(HDict([('b', frozenset(['0'])), ('a', frozenset(['0']))]), is_and=False)
+    >>> h = bdddb.expr_of_dict_dict(HDict([('a', frozenset(['0']))]), is_and=False)
+
+    g is the negation of f
+    >>> bdddb.myAnd([f, g]) == BddDB.FALSE, bdddb.myOr([f, g]) == BddDB.TRUE
+    (True, True)
+    >>> k = bdddb.expr_of_dict_dict(HDict([('a', frozenset(['0'])), ('b', frozenset(['1','2']))]), is_and=False)
+    >>> assert bdddb.myOr([f, h]) == k != bdddb.myOr([f, g])
+    >>> bdddb.myAnd([]) is None and bdddb.myAnd([None, h]) == h
+    True
     """
+    FALSE, TRUE = 0, 1
+
+    def __init__(self, dom):
+        assert isinstance(dom, Dom), dom
+
+        self.cols = dict((k, j) for j, k in enumerate(dom))
+        self.vals = [sorted(vs) for vs in dom.itervalues()]
+        self.nodes = [None, None]  #node -> (col, children)
+        self.unique = {}  #(col, children) -> node
+        self.cache = {}  #like Z3DB.cache
+        self._ops = {}  #(op, node, node) -> node
+        self._negs = {}  #node -> not node
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def mk(self, j, children):
+        c = children[0]
+        if all(c_ == c for c_ in children):
+            return c
+        key = (j, children)
+        try:
+            return self.unique[key]
+        except KeyError:
+            node = len(self.nodes)
+            self.nodes.append(key)
+            self.unique[key] = node
+            return node
+
+    def _terminal(self, is_and, a, b):
+        #ret result if it does not need the children of a and b
+        if a == b:
+            return a
+        if is_and:
+            if a == self.FALSE or b == self.FALSE: return self.FALSE
+            if a == self.TRUE: return b
+            if b == self.TRUE: return a
+        else:
+            if a == self.TRUE or b == self.TRUE: return self.TRUE
+            if a == self.FALSE: return b
+            if b == self.FALSE: return a
+        return None
+
+    def apply(self, is_and, a, b):
+        """
+        Ret the node of a & b (is_and) or a | b.
+        Iterative (nodes can have hundreds of levels, e.g., busybox).
+        """
+        nodes, ops = self.nodes, self._ops
+
+        def get(a, b):
+            r = self._terminal(is_and, a, b)
+            if r is None:
+                r = ops.get((is_and, a, b) if a < b else (is_and, b, a))
+            return r
+
+        todo = [(a, b)]
+        while todo:
+            a, b = todo[-1]
+            if get(a, b) is not None:
+                todo.pop()
+                continue
+
+            ja, jb = nodes[a][0], nodes[b][0]
+            j = min(ja, jb)
+            cas = nodes[a][1] if ja == j else None
+            cbs = nodes[b][1] if jb == j else None
+            n = len(cas if cas else cbs)
+            pairs = [(cas[i] if cas else a, cbs[i] if cbs else b)
+                     for i in range(n)]
+            rs = [get(a_, b_) for a_, b_ in pairs]
+            if None in rs:
+                todo.extend(p for p, r in zip(pairs, rs) if r is None)
+                continue
+
+            ops[(is_and, a, b) if a < b else (is_and, b, a)] = \
+                self.mk(j, tuple(rs))
+            todo.pop()
+
+        return get(a, b)
+
+    def neg(self, a):
+        """
+        Ret the node of not a (iterative as apply)
+        """
+        nodes, negs = self.nodes, self._negs
+        todo = [a]
+        while todo:
+            b = todo[-1]
+            if b < 2 or b in negs:
+                todo.pop()
+                continue
+
+            j, cs = nodes[b]
+            rs = [1 - c if c < 2 else negs.get(c) for c in cs]
+            if None in rs:
+                todo.extend(c for c, r in zip(cs, rs) if r is None)
+                continue
+
+            nb = self.mk(j, tuple(rs))
+            negs[b] = nb
+            negs[nb] = b
+            todo.pop()
+
+        return 1 - a if a < 2 else negs[a]
+
+    #checks, None is true as in z3util
+    def is_sat(self, f):
+        return f != self.FALSE
+
+    def implies(self, f, g):
+        """
+        >>> dom = Dom([('a', frozenset(['0','1'])), ('b', frozenset(['0','1','2']))])
+        >>> bdddb = BddDB(dom)
+        >>> f = bdddb.expr_of_dict(HDict([('a', '1'), ('b', '2')]))
+        >>> g = bdddb.expr_of_dict_dict(HDict([('b', frozenset(['1','2']))]), is_and=True)
+        >>> bdddb.implies(f, g), bdddb.implies(g, f), bdddb.implies(g, None)
+        (True, False, True)
+        >>> bdddb.implies(None, g), bdddb.implies(None, bdddb.myOr([g, bdddb.neg(g)]))
+        (False, True)
+        >>> bdddb.equiv(bdddb.neg(bdddb.neg(f)), f), bdddb.is_sat(bdddb.myAnd([g, bdddb.neg(g)]))
+        (True, False)
+        """
+        if g is None:
+            return True
+        if f is None:
+            f = self.TRUE
+        return self.apply(True, f, self.neg(g)) == self.FALSE
+
+    def equiv(self, f, g):
+        return (self.TRUE if f is None else f) == (self.TRUE if g is None else g)
+
+    def myAnd(self, fs):
+        #similar to z3util.myAnd, i.e., ignore None and ret None if empty
+        return self._fold(True, fs)
+
+    def myOr(self, fs):
+        return self._fold(False, fs)
+
+    def _fold(self, is_and, fs):
+        fs = [f for f in fs if f is not None]
+        if not fs:
+            return None
+        return reduce(lambda a, b: self.apply(is_and, a, b), fs)
+
+    def expr_of_dict(self, d):
+        #like Z3DB.expr_of_dict
+        if d in self.cache:
+            return self.cache[d]
+
+        node = self.expr_of_dict_dict(
+            HDict((k, frozenset([v])) for k, v in d.iteritems()), is_and=True)
+        self.cache[d] = node
+        return node
+
+    def expr_of_dict_dict(self, d, is_and):
+        """
+        Like Z3DB.expr_of_dict_dict, built bottom up (in col order)
+        """
+        key = (d, is_and)
+        if key in self.cache:
+            return self.cache[key]
+
+        if d:
+            jvs = sorted(((self.cols[k], vs) for k, vs in d.iteritems()),
+                         reverse=True)
+            if is_and:
+                node = self.TRUE
+                for j, vs in jvs:
+                    node = self.mk(j, tuple(node if v in vs else self.FALSE
+                                            for v in self.vals[j]))
+            else:
+                node = self.FALSE
+                for j, vs in jvs:
+                    node = self.mk(j, tuple(self.TRUE if v in vs else node
+                                            for v in self.vals[j]))
+        else:
+            node = None
+
+        self.cache[key] = node
+        return node
+
+
+class _ConfigKeys(object):
+    """
+    Option names (and their positions) shared by configs,
+    and the tables of their values if the configs code their values 
+    (see Config.mk_raw)
+    """
+    __slots__ = ('keys', 'pos', 'coded', 'vals')
+    def __init__(self, keys, coded, vals):
+        self.keys = keys
+        self.pos = dict((k, i) for i, k in enumerate(keys))
+        self.coded = coded
+        self.vals = vals  #i -> ([v1, ..., vm], {vi -> i}) of keys[i]
+
+class _ConfigTables(object):
+    """
+    Tables of the option names and values coded by configs.
+    Each Dom (e.g., of another program) starts new tables.
+    Configs keep the tables they are coded with (in their _ConfigKeys),
+    so their codes are never remapped.
+    """
+    __slots__ = ('keys', 'vals')
+    def __init__(self):
+        self.keys = {}  #((k1, ..., kn), coded) -> _ConfigKeys
+        self.vals = {}  #k -> ([v1, ..., vm], {vi -> i})
+
+_config_tables = _ConfigTables()
+def _mk_raw_config(cls, config): return cls.mk_raw(config)  #for pickle
+        
+class Config(object):
+    """
+    Compact and immutable (hashable) mapping from options to values.
+    Option names are interned and values are stored as (byte) codes
+    (except in mk_raw configs),
+    so configs of large domains (e.g., 900 options) take little memory.
+
     >>> c = Config([('a', '1'), ('b', '0'), ('c', '1')])
     >>> print c
     a=1 b=0 c=1
@@ -401,12 +736,167 @@ class Config(HDict):
     ('c',frozenset(['0','1','2']))])
     >>> c.z3expr(Z3DB(dom))
     And(a == 1, b == 0, c == 1)
+
+    >>> c['b'], 'b' in c, 'd' in c, len(c), c.keys()
+    ('0', True, False, 3, ['a', 'b', 'c'])
+    >>> c2 = Config([('b', '0'), ('a', '1'), ('c', '1')])
+    >>> assert c == c2 and hash(c) == hash(c2) and c == Config(c)
+    >>> assert c != Config([('a', '1'), ('b', '1'), ('c', '1')])
+    >>> assert len(set([c, c2, Config(c)])) == 1
+    
+    >>> import cPickle as pickle
+    >>> assert pickle.loads(pickle.dumps(c, 2)) == c
+    >>> c
+    Config([('a', '1'), ('b', '0'), ('c', '1')])
+
+    >>> c3 = Config.mk_raw([('a', '1'), ('x', 0.5)])
+    >>> c3['x'], c3.items(), 'x' in _config_tables.vals
+    (0.5, [('a', '1'), ('x', 0.5)], False)
+    >>> assert c3 == Config.mk_raw(c3.items()) != c
+    >>> c3 = pickle.loads(pickle.dumps(c3, 2))
+    >>> c3.items(), 'x' in _config_tables.vals
+    ([('a', '1'), ('x', 0.5)], False)
+
+    A new dom starts new tables, configs coded before keep theirs
+    >>> dom = Dom([('a',frozenset(['1','2']))])
+    >>> c4 = Config([('a', '2'), ('b', '0')])
+    >>> list(c4.codes), c4['a'], c['a'], c4._ks.vals[0] is c._ks.vals[0]
+    ([0, 0], '2', '1', False)
+    >>> assert Config(c.items()) == c == c2
     """
-    def __init__(self,config=HDict()):
-        HDict.__init__(self, config)
+    __slots__ = ('_ks', '_vs', '_hash')
+    
+    def __init__(self, config=()):
+        if isinstance(config, Config):
+            self._ks, self._vs, self._hash = config._ks, config._vs, config._hash
+            return
+        
+        items = config.iteritems() if hasattr(config, 'iteritems') else config
+        ks, vs = [], []
+        for k, v in items:
+            ks.append(k)
+            vs.append(v)
+
+        if len(set(ks)) != len(ks):  #as dict, the last value is used
+            d = OrderedDict(zip(ks, vs))
+            ks, vs = d.keys(), d.values()
+            
+        self._set(ks, vs)
         
         assert all(is_setting(s) for s in self.iteritems()), self
 
+    @classmethod
+    def mk_raw(cls, config):
+        """
+        Like cls(config) but keep the values as is instead of coding them.
+        For the random values of inf options (see alg.Config.real), 
+        which would grow the tables of values shared by all configs.
+        """
+        c = cls()
+        ks, vs = zip(*config) if config else ((), ())
+        c._set(ks, vs, coded=False)
+        return c
+        
+    def _set(self, ks, vs, coded=True):
+        ks = tuple(ks)
+        tables = _config_tables
+        try:
+            cks = tables.keys[ks, coded]
+        except KeyError:
+            vals = None
+            if coded:
+                vals = [tables.vals.setdefault(k, ([], {})) for k in ks]
+            cks = tables.keys[ks, coded] = _ConfigKeys(ks, coded, vals)
+        self._ks = cks
+        self._hash = hash(frozenset(itertools.izip(ks, vs)))  #as HDict
+        if not coded:
+            self._vs = tuple(vs)
+            return
+
+        codes = []
+        for (vals, codes_d), v in itertools.izip(cks.vals, vs):
+            try:
+                code = codes_d[v]
+            except KeyError:
+                code = codes_d[v] = len(vals)
+                vals.append(v)
+            codes.append(code)
+
+        if all(code < 256 for code in codes):
+            self._vs = str(bytearray(codes))
+        else:
+            self._vs = tuple(codes)
+
+    @property
+    def codes(self):
+        assert self._ks.coded
+        vs = self._vs
+        return bytearray(vs) if vs.__class__ is str else vs
+        
+    def __getitem__(self, k):
+        i = self._ks.pos[k]
+        vs = self._vs
+        if not self._ks.coded:
+            return vs[i]
+        code = ord(vs[i]) if vs.__class__ is str else vs[i]
+        return self._ks.vals[i][0][code]
+
+    def get(self, k, default=None):
+        return self[k] if k in self else default
+        
+    def __contains__(self, k): return k in self._ks.pos
+    def __iter__(self): return iter(self._ks.keys)
+    def __len__(self): return len(self._ks.keys)
+    def iterkeys(self): return iter(self._ks.keys)
+    def keys(self): return list(self._ks.keys)
+
+    def iteritems(self):
+        if not self._ks.coded:
+            return itertools.izip(self._ks.keys, self._vs)
+        return ((k, vals[code]) for k, (vals, _), code 
+                in itertools.izip(self._ks.keys, self._ks.vals, self.codes))
+
+    def itervalues(self):
+        for _, v in self.iteritems():
+            yield v
+            
+    def items(self): return list(self.iteritems())
+    def values(self): return list(self.itervalues())
+
+    @property
+    def hcontent(self):
+        return frozenset(self.iteritems())
+    
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if other is self:
+            return True
+        if not isinstance(other, Config) or self._hash != other._hash:
+            return False
+        if self._ks is other._ks:
+            return self._vs == other._vs
+        return self.hcontent == other.hcontent
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        return isinstance(other, Config) and self.hcontent < other.hcontent
+
+    def __reduce__(self):
+        if not self._ks.coded:
+            return (_mk_raw_config, (self.__class__, self.items()))
+        return (self.__class__, (self.items(),))
+
+    def __setstate__(self, state):
+        #data saved when Config was an (Ordered)dict has cached attributes
+        pass
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, self.items())
+    
     def __str__(self, cov=None):
         assert cov is None or is_cov(cov), cov
 
@@ -459,11 +949,20 @@ class Covs_d(CustDict):
     """
 
     def add(self,sid, config):
-        assert isinstance(sid, str),sid
+        assert is_sid(sid),sid
         assert isinstance(config, Config),config
         
         super(Covs_d, self).add_set(sid, config)
 
+    def map_sids(self, f):
+        """
+        Ret a copy whose sids are f(sid), e.g., ids -> sids (SidTable)
+        """
+        covs_d = Covs_d()
+        for sid, configs in self.iteritems():
+            covs_d.__dict__[f(sid)] = configs
+        return covs_d
+
 class Configs_d(CustDict):
     """
     A mapping from config -> {covs}
@@ -478,6 +977,155 @@ class Configs_d(CustDict):
         ss = (c.__str__(self[c]) for c in self.__dict__)
         return '\n'.join("{}. {}".format(i+1, s) for i, s in enumerate(ss))
 
+    def map_covs(self, f):
+        """
+        Ret a copy whose covs are f(cov), e.g., ids -> sids (SidTable)
+        """
+        configs_d = Configs_d()
+        for config, cov in self.iteritems():
+            configs_d[config] = f(cov)
+        return configs_d
+
+class SidTable(object):
+    """
+    Table of the sids of a run, (string) sid <-> (int) id.
+    During a run, covs are sets of ids (see IGen.eval_configs), 
+    which are smaller than sid strings in memory and pickles (*.tvn).
+    The table is saved once in the run dir (DTrace.save_pre),
+    and ids are mapped back to sids for display and analysis.
+
+    >>> t = SidTable()
+    >>> cov1 = t.get_ids(['L1', 'L2'])
+    >>> cov2 = t.get_ids(['L3', 'L2'])
+    >>> sorted(cov1), sorted(cov2), len(t), t[2]
+    ([0, 1], [1, 2], 3, 'L3')
+    >>> sorted(t.get_sids(cov2))
+    ['L2', 'L3']
+
+    >>> import cPickle as pickle
+    >>> t = pickle.loads(pickle.dumps(t, 2))
+    >>> t.get_id('L3'), t.get_id('L4'), len(t)
+    (2, 3, 4)
+    """
+    def __init__(self, sids=()):
+        self._set(list(sids))
+
+    def _set(self, sids):
+        self.sids = sids  #id -> sid
+        self.ids = dict((sid, i) for i, sid in enumerate(sids))
+
+    def __len__(self): return len(self.sids)
+    def __getitem__(self, i): return self.sids[i]
+    
+    def get_id(self, sid):
+        try:
+            return self.ids[sid]
+        except KeyError:
+            assert isinstance(sid, str), sid
+            i = self.ids[sid] = len(self.sids)
+            self.sids.append(sid)
+            return i
+
+    def get_ids(self, cov):
+        get_id = self.get_id
+        return set(get_id(sid) for sid in cov)
+
+    def get_sids(self, ids):
+        sids = self.sids
+        return set(sids[i] for i in ids)
+
+    #only save the sids
+    def __getstate__(self): return self.sids
+    def __setstate__(self, sids): self._set(sids)
+
+class CovCache(object):
+    """
+    Persistent (sqlite) store of eval results of configs,
+    keyed by (fingerprint of the program, config).
+    Can be shared by multiple runs (e.g., different seeds).
+
+    >>> import tempfile
+    >>> db_file = os.path.join(tempfile.mkdtemp(), 'covs.sqlite')
+    >>> c1 = Config([('a', '0'), ('b', '1')])
+    >>> c2 = Config([('b', '1'), ('a', '0')])
+    >>> cache = CovCache(db_file, 'fp1')
+    >>> assert cache.get(c1) is None
+    >>> cache.put([(c1, set(['L1', 'L2']))])
+    >>> assert cache.get(c2) == set(['L1', 'L2'])
+    >>> assert CovCache(db_file, 'fp2').get(c1) is None
+    >>> assert CovCache(db_file, 'fp1').get(c1) == set(['L1', 'L2'])
+    >>> print cache.stat
+    (1, 1)
+    """
+    def __init__(self, db_file, fingerprint):
+        assert isinstance(db_file, str), db_file
+        assert isinstance(fingerprint, str) and fingerprint, fingerprint
+
+        import sqlite3
+        self.db_file = db_file
+        self.fingerprint = fingerprint
+        self.conn = sqlite3.connect(db_file, timeout=60)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS covs "
+                          "(fp TEXT, config TEXT, rs BLOB, "
+                          "PRIMARY KEY (fp, config))")
+        self.conn.commit()
+        self.nhits = 0
+        self.nmisses = 0
+
+    def __str__(self):
+        return "cov cache '{}' ({} hits, {} misses)".format(
+            self.db_file, self.nhits, self.nmisses)
+
+    @property
+    def stat(self): return (self.nhits, self.nmisses)
+
+    @staticmethod
+    def key_of_config(config):
+        #independent of the order of settings
+        return ' '.join(map(str_of_setting, sorted(config.iteritems())))
+
+    def get(self, config):
+        """
+        Ret the cached result of config or None if not avail
+        """
+        import cPickle as pickle
+        row = self.conn.execute(
+            "SELECT rs FROM covs WHERE fp = ? AND config = ?",
+            (self.fingerprint, self.key_of_config(config))).fetchone()
+        if row is None:
+            self.nmisses += 1
+            return None
+        else:
+            self.nhits += 1
+            return pickle.loads(str(row[0]))
+
+    def put(self, results):
+        """
+        Store a list of (config, rs)
+        """
+        import sqlite3
+        import cPickle as pickle
+        rows = [(self.fingerprint, self.key_of_config(c),
+                 sqlite3.Binary(pickle.dumps(rs, -1)))
+                for c, rs in results]
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO covs VALUES (?, ?, ?)", rows)
+        self.conn.commit()
+
+    @staticmethod
+    def get_fingerprint(files, extra=''):
+        """
+        Ret a hash of the contents of files (e.g., prog exe, run script)
+        """
+        import hashlib
+        h = hashlib.md5(extra)
+        for f in sorted(files):
+            h.update(f)
+            with open(f, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), ''):
+                    h.update(chunk)
+        return h.hexdigest()
+
 
 if __name__ == "__main__":
     import doctest
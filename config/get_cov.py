@@ -1,4 +1,7 @@
 import os.path
+import shlex
+import struct
+import tempfile
 import vu_common as CM
 import config_common as CC
 
@@ -6,11 +9,34 @@ logger = CM.VLog('get_cov')
 logger.level = CC.logger_level
 
 # Real executions
-def run_single(cmd):
+class Timeout(Exception):
+    """
+    A run of the prog exceeds the limits (CC.timeout, CC.cpu_limit, 
+    CC.mem_limit), which is an outcome (CC.timeout_sid) of the config, 
+    not an error
+    """
+    pass
+
+def run_single(cmd, limits=False):
+    """
+    If limits, run cmd within the limits CC.timeout, CC.cpu_limit and
+    CC.mem_limit (if any), and raise Timeout if it exceeds one of them.
+    """
     logger.detail(cmd)
     rs_err = "some error"
+    shell = needs_shell(cmd)
+    args = cmd if shell else shlex.split(cmd)
     try:
-        rs_outp,rs_err = CM.vcmd(cmd)
+        if limits and (CC.timeout or CC.cpu_limit or CC.mem_limit):
+            rs_outp,rs_err,exceeded = CM.vcmd_limit(
+                args, shell=shell, timeout=CC.timeout,
+                cpu=CC.cpu_limit, mem=CC.mem_limit)
+            if exceeded:
+                logger.warn("cmd '{}' exceeds the {} limit"
+                            .format(cmd, exceeded))
+                raise Timeout(cmd)
+        else:
+            rs_outp,rs_err = CM.vcmd(args, shell=shell)
         if rs_outp:
             logger.detail("outp: {}".format(rs_outp))
         
@@ -39,62 +65,628 @@ def run_single(cmd):
                     raise AssertionError("Check this serious error!")
             
         return (rs_outp, rs_err)
-    
+
+    except Timeout:
+        raise
     except Exception as e:
         raise AssertionError("cmd '{}' fails, raise error: {}, {}"
                              .format(cmd, rs_err, e))
 
 
-def runscript_get_cov(config,run_script):
+def needs_shell(cmd):
+    """
+    Ret True if cmd uses shell features, e.g., pipes, redirections, 
+    globs, ~ or quotes, otherwise it can be exec'ed directly
+
+    >>> needs_shell('/bin/ls -l -a /tmp/d')
+    False
+    >>> needs_shell('ls /boot/* | sort -r')
+    True
+    >>> needs_shell('date -d "next Thursday"')
+    True
+    >>> needs_shell('cat ~notexistfile')
+    True
+    """
+    return any(c in _shell_chars for c in cmd)
+_shell_chars = frozenset('|&;<>()$`\\"\'\n*?[]#~=%{}!')
+
+def runscript_get_cov(config,run_script,server=False):
     """
     Get cov from config (a dict with {var -> val} mapping)
+    If server is set, send config to a long-lived run_script
+    (see RunScriptServer) and fall back to one-shot runs
+    if run_script does not support this mode.
     """
     assert os.path.isfile(run_script), run_script
     
     inputs = ' , '.join(['{} {}'.format(vname,vval) for
                          vname,vval in config.iteritems()])
-    cov = run_runscript(run_script,inputs)
+    rserver = get_runscript_server(run_script) if server else None
+    if rserver:
+        cov = rserver.get_cov(inputs)
+    else:
+        try:
+            cov = run_runscript(run_script,inputs)
+        except Timeout:
+            cov = set([CC.timeout_sid])
     return cov,[]
     
+_runscript_shared = {}  #run_script -> writes its own (fixed) cov file
 def run_runscript(run_script, arg):
     """
     Exec runscript on arg and return a single line representing the cov file
     E.g., ./runscript.sh "args"
-    """
 
+    The run_script should write the cov file to $IGEN_COV_FILE, 
+    a file of the calling process, so that runs of eval workers (-jobs),
+    benchmark runs (-cores) and other igen invocations are independent.
+    A run_script writing a file of its own (e.g., /var/tmp/tvn.out)
+    might overwrite the files of its other runs, so its runs 
+    (and reading their cov files) are serialized with a lock 
+    of the run_script.  Its first run is locked as it is unknown 
+    if the run_script writes $IGEN_COV_FILE.
+    A RunScriptServer (-server) uses its own cov file and is not locked.
+    """
+    cov_file = os.path.join(tempfile.gettempdir(),
+                            'igen_cov.{}.out'.format(os.getpid()))
+    os.environ['IGEN_COV_FILE'] = cov_file
     cmd = "{} \"{}\"".format(run_script,arg)
-    rs_outp,rs_err = run_single(cmd)
-    cov_filename  = [l for l in rs_outp.split('\n') if l]
-    assert len(cov_filename) == 1, (cmd,rs_outp,cov_filename)
-    cov_filename = cov_filename[0]
-    cov = set(CM.iread_strip(cov_filename))
+    
+    def _f():
+        rs_outp,rs_err = run_single(cmd, limits=True)
+        cov_filename  = [l for l in rs_outp.split('\n') if l]
+        assert len(cov_filename) == 1, (cmd,rs_outp,cov_filename)
+        cov_filename = cov_filename[0]
+        cov = set(CM.iread_strip(cov_filename))
+        return cov_filename, cov
+
+    if _runscript_shared.get(run_script, True):
+        import fcntl
+        import hashlib
+        lock_file = os.path.join(
+            tempfile.gettempdir(), 'igen_runscript.{}.lock'.format(
+                hashlib.md5(os.path.realpath(run_script)).hexdigest()))
+        with open(lock_file, 'a') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                cov_filename, cov = _f()
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+    else:
+        cov_filename, cov = _f()
+
+    _runscript_shared[run_script] = cov_filename != cov_file
+    if cov_filename == cov_file:
+        os.remove(cov_file)
+        
     logger.detail("cmd {}, read {} covs from '{}'"
                   .format(cmd,len(cov),cov_filename))
     return cov
 
-def run(cmds, msg=''):
-    "just exec command, does not return anything"
+class RunScriptServer(object):
+    """
+    Persistent mode of a run_script, which avoids starting a shell and
+    reading back a cov file for every config.
+
+    The run_script is started once as "run_script --server" and
+    first prints the line HELLO.  Then for each config line on stdin,
+    e.g., "x 0 , y 1 , z 0", it prints the number n of covered sids
+    followed by n lines, one sid per line.
+    """
+    HELLO = "igen-server"
+    
+    def __init__(self, run_script):
+        assert os.path.isfile(run_script), run_script
+        import subprocess as sp
+        
+        self.run_script = run_script
+        self.proc = sp.Popen([run_script, "--server"],
+                             stdin=sp.PIPE, stdout=sp.PIPE,
+                             close_fds=True)
+        hello = self.proc.stdout.readline().strip()
+        if hello != self.HELLO:
+            logger.warn("'{}' does not support server mode (got '{}'), "
+                        "use one-shot runs".format(run_script, hello))
+            self.stop()
+
+    def __nonzero__(self):
+        return self.proc is not None
+    
+    def get_cov(self, arg):
+        assert self.proc, self.run_script
+        assert '\n' not in arg, arg
+
+        self.proc.stdin.write(arg + '\n')
+        self.proc.stdin.flush()
+        readline = self.proc.stdout.readline
+        n = readline()
+        assert n, "'{}' exits on '{}'".format(self.run_script, arg)
+        n = int(n)
+        cov = set(readline().strip() for _ in range(n))
+        cov.discard('')
+        logger.detail("arg {}, read {} covs from '{}'"
+                      .format(arg, len(cov), self.run_script))
+        return cov
+
+    def stop(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+            self.proc.wait()
+        except (IOError, OSError):
+            pass
+        self.proc = None
+
+_runscript_servers = {}
+def get_runscript_server(run_script):
+    """
+    Ret the server of run_script owned by the current process
+    (each evaluation worker has its own server).
+    """
+    key = (os.getpid(), run_script)
+    try:
+        return _runscript_servers[key]
+    except KeyError:
+        import atexit
+        rserver = RunScriptServer(run_script)
+        if rserver:
+            atexit.register(rserver.stop)
+        _runscript_servers[key] = rserver
+        return rserver
+
+def run(cmds, msg='', jobs=1, limits=False):
+    """
+    just exec command, does not return anything.
+    If jobs > 1, up to jobs cmds (which must be independent) run at once,
+    and their outputs are kept in the order of cmds.
+    If limits, the cmds run within the limits (see run_single) 
+    and the result also has CC.timeout_sid if some of them exceed the limits.
+    """
     assert cmds, cmds
     
     if not CM.is_iterable(cmds): cmds = [cmds]
     logger.detail('run {} cmds{}'
                   .format(len(cmds),' ({})'.format(msg) if msg else''))
-    outp = tuple(run_single(cmd) for cmd in cmds)
-    outp = hash(outp)
-    return set([str(outp)])
+    def run_f(cmd):
+        try:
+            return run_single(cmd, limits)
+        except Timeout:
+            return CC.timeout_sid
+        
+    if jobs > 1 and len(cmds) > 1:
+        #threads suffice as they just wait for the cmds
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(jobs, len(cmds)))
+        try:
+            outp = tuple(pool.map(run_f, cmds))
+        finally:
+            pool.close()
+    else:
+        outp = tuple(run_f(cmd) for cmd in cmds)
+    rs = set([str(hash(outp))])
+    if CC.timeout_sid in outp:
+        rs.add(CC.timeout_sid)
+    return rs
+
+def parse_gcov(gcov_file, src_files=None):
+    """
+    Ret the sids (src_file:line) of the executed lines in gcov_file.
+    The file is scanned line by line, and if src_files is given
+    then a gcov file of another source file is not read further.
 
-import gcovparse
-def parse_gcov(gcov_file):
+    >>> import tempfile
+    >>> gcov_file = os.path.join(tempfile.mkdtemp(), 'ex.c.gcov')
+    >>> CM.vwrite(gcov_file, '\\n'.join([
+    ... '        -:    0:Source:ex.c',
+    ... '        -:    0:Runs:1',
+    ... '        -:    1:#include <stdio.h>',
+    ... '        1:    2:int main(){',
+    ... '       1*:    3:  if (x) y = 1;',
+    ... '    #####:    4:  z = 2;',
+    ... '    =====:    5:  throw;',
+    ... '       12:    6:  for (;;) {}',
+    ... 'branch  0 taken 2',
+    ... '        1:    7:}']))
+    >>> print sorted(parse_gcov(gcov_file))
+    ['ex.c:2', 'ex.c:3', 'ex.c:6', 'ex.c:7']
+    >>> print sorted(parse_gcov(gcov_file, set(['ex.c'])))
+    ['ex.c:2', 'ex.c:3', 'ex.c:6', 'ex.c:7']
+    >>> print sorted(parse_gcov(gcov_file, set(['ls.c'])))
+    []
+    """
     if __debug__:
         assert os.path.isfile(gcov_file)
+        assert src_files is None or isinstance(src_files, set), src_files
+
+    src_file = None
+    sids = set()
+    with open(gcov_file) as fh:
+        for l in fh:
+            #hit:line:data, e.g., '    #####:   33:}'
+            parts = l.split(':', 2)
+            if len(parts) != 3:  #e.g., branch and call info
+                continue
+            
+            hit, line, data = parts
+            hit = hit.strip()
+            if hit[:1].isdigit():  #e.g., 5 or 5* (some blocks not exec)
+                if int(hit.rstrip('*')) > 0:
+                    assert src_file, gcov_file
+                    sids.add("{}:{}".format(src_file, int(line)))
+            elif hit == '-' and line.strip() == '0' and \
+                 data.startswith('Source:'):
+                assert src_file is None, (gcov_file, src_file)
+                src_file = data[len('Source:'):].rstrip('\n')
+                if src_files is not None and src_file not in src_files:
+                    break
 
-    gcov_obj = gcovparse.gcovparse(CM.vread(gcov_file))
-    assert len(gcov_obj) == 1, gcov_obj
-    gcov_obj = gcov_obj[0]
-    sids = (d['line'] for d in gcov_obj['lines'] if d['hit'] > 0)
-    sids = set("{}:{}".format(gcov_obj['file'],line) for line in sids)
     return sids
 
+def get_src_files(sids):
+    """
+    Ret the source files of sids (src_file:line),
+    or None if some sid is not of this form.
+
+    >>> print sorted(get_src_files(['ls.c:5', 'ls.c:10', 'src/system.h:3']))
+    ['ls.c', 'src/system.h']
+    >>> print get_src_files(['ls.c:5', 'L2'])
+    None
+    """
+    src_files = set()
+    for sid in sids:
+        src_file, _, line = sid.rpartition(':')
+        if not src_file or not line.isdigit():
+            return None
+        src_files.add(src_file)
+    return src_files
+
+#Read the arc counters of *.gcda files directly instead of running gcov,
+#using the flow graphs (and line info) of the *.gcno file of the prog
+class GcovFile(object):
+    """
+    Records of a *.gcno or *.gcda file (GCC >= 4.7), 
+    in the byte order and units (bytes or words) given by its header
+    """
+    def __init__(self, filename, magic):
+        with open(filename, 'rb') as fh:
+            self.buf = fh.read()
+        self.filename = filename
+
+        endian, self.version = self.get_header(self.buf, magic)
+        assert endian, "'{}' is not a {} file".format(filename, magic)
+        self._u32 = struct.Struct(endian + 'I').unpack_from
+        self.pos = 8
+        self.stamp = self.u32()
+        #gcc 12+: lengths in bytes (not words) and a checksum
+        self.nbytes = self.version >= (12, 0)
+        if self.nbytes:
+            self.checksum = self.u32()
+
+    @staticmethod
+    def get_header(buf, magic):
+        """
+        Ret the byte order and gcc version of the file starting with buf,
+        (None, None) if it is not a magic file
+
+        >>> GcovFile.get_header('oncg*22B', 'gcno')
+        ('<', (12, 2))
+        >>> GcovFile.get_header('gcda407*', 'gcda')
+        ('>', (4, 7))
+        >>> GcovFile.get_header('gcda', 'gcno')
+        (None, None)
+        """
+        if buf[:4] == magic[::-1]:
+            endian, v = '<', buf[4:8][::-1]
+        elif buf[:4] == magic:
+            endian, v = '>', buf[4:8]
+        else:
+            return None, None
+
+        #e.g., B22* (12.2), A93* (9.3) or 407* (4.7)
+        if v[0] >= 'A':
+            version = ((ord(v[0]) - ord('A')) * 10 + int(v[1]), int(v[2]))
+        else:
+            version = (int(v[0]), int(v[1:3]))
+        return endian, version
+
+    def u32(self):
+        v = self._u32(self.buf, self.pos)[0]
+        self.pos += 4
+        return v
+
+    def string(self):
+        n = self.u32()
+        if not n:
+            return None
+        if not self.nbytes:
+            n *= 4
+        s = self.buf[self.pos:self.pos + n].rstrip('\0')
+        self.pos += n
+        return s
+
+    def records(self):
+        """
+        Yield (tag, n) of each record, whose data (of n bytes) 
+        starts at pos.  gcc 12+ uses n < 0 for -n bytes of zero counters
+        (the data is not in the file).
+        """
+        while self.pos + 8 <= len(self.buf):
+            tag = self.u32()
+            if not tag:
+                break
+            n = self.u32()
+            if n >= 1 << 31:
+                n -= 1 << 32
+            elif not self.nbytes:
+                n *= 4
+            end = self.pos + max(n, 0)
+            assert end <= len(self.buf), (self.filename, tag, n)
+            yield tag, n
+            self.pos = end
+
+class Gcno(object):
+    """
+    Flow graphs of the functions in a *.gcno file, 
+    used to get the executed lines (sids) from the arc counters 
+    in the *.gcda files of the same build (see gcov).
+    src_dir is where gcov would run, i.e., source paths are relative to it.
+    """
+    FUNCTION = 0x01000000
+    BLOCKS = 0x01410000
+    ARCS = 0x01430000
+    LINES = 0x01450000
+    ARC_COUNTS = 0x01a10000
+    ARC_ON_TREE = 1
+    MIN_VERSION = (8, 0)  #the line counts of gcov (see get_cov)
+    
+    def __init__(self, gcno_file, src_dir):
+        f = GcovFile(gcno_file, 'gcno')
+        assert f.version >= self.MIN_VERSION, (gcno_file, f.version)
+        self.version = f.version
+        self.stamp = f.stamp
+        _ = f.string()  #cwd
+        if f._u32(f.buf, f.pos)[0] != self.FUNCTION:
+            _ = f.u32()  #supports unexecuted blocks
+
+        names = {}
+        def canon(name):
+            try:
+                return names[name]
+            except KeyError:
+                names[name] = canonicalize_name(name, src_dir)
+                return names[name]
+
+        #ident -> [checksums, nblocks, arcs, lines of blocks, 
+        #the last lines of their locations]
+        self.funs = CM.OrderedDict()
+        for tag, n in f.records():
+            end = f.pos + n
+            if tag == self.FUNCTION:
+                ident = f.u32()
+                checksums = (f.u32(), f.u32())
+                arcs, lines, lasts = [], {}, {}
+                self.funs[ident] = [checksums, 0, arcs, lines, lasts]
+            elif tag == self.BLOCKS:
+                self.funs[ident][1] = f.u32()
+            elif tag == self.ARCS:
+                src = f.u32()
+                while f.pos < end:
+                    dst, flags = f.u32(), f.u32()
+                    arcs.append((src, dst, flags & self.ARC_ON_TREE))
+            elif tag == self.LINES:
+                block = f.u32()
+                lines.setdefault(block, set())
+                lasts.setdefault(block, [])
+                src_file = last = None
+                loc = []  #lines of a location (in a src_file)
+                while f.pos < end:
+                    line = f.u32()
+                    if line:
+                        assert src_file, (gcno_file, block)
+                        loc.append(line)
+                        lines[block].add((src_file, line))
+                    else:
+                        #gcov sorts the lines of a location
+                        if loc:
+                            last = (src_file, max(loc))
+                            loc = []
+                        if src_file and last:
+                            lasts[block].append(last)
+                        src_file = f.string()
+                        if src_file is None:
+                            break
+                        src_file = canon(src_file)
+
+        #ident -> (checksums, arcs, lines of blocks, 
+        #lines whose blocks each arc enters from another block),
+        #lines having blocks (see get_cov)
+        self.block_lines = set()
+        for ident, (checksums, nblocks, arcs, lines, lasts) in \
+                self.funs.iteritems():
+            lasts = dict((block, set(lasts_))
+                         for block, lasts_ in lasts.iteritems()
+                         if block and block + 1 != nblocks)
+            blocks_d = {}
+            for block, lasts_ in lasts.iteritems():
+                for line in lasts_:
+                    blocks_d.setdefault(line, set()).add(block)
+            self.block_lines.update(blocks_d)
+            enters = [[l for l in lasts.get(dst, ()) if src not in blocks_d[l]]
+                      for src, dst, _ in arcs]
+            self.funs[ident] = (checksums, arcs, lines, enters)
+
+    def __len__(self): return len(self.funs)
+
+    @classmethod
+    def is_supported(cls, gcno_file):
+        with open(gcno_file, 'rb') as fh:
+            _, version = GcovFile.get_header(fh.read(8), 'gcno')
+        return version is not None and version >= cls.MIN_VERSION
+
+    def get_cov(self, gcda_file, src_files=None):
+        """
+        Ret the sids (src_file:line) of the lines executed by gcov 
+        (only those of src_files if given).
+
+        As gcov, the blocks of a line are those (but the first and the 
+        last ones of a function) whose locations end with it 
+        (their lines are sorted).  A line having blocks is executed 
+        if an arc from another block enters them (a loop within them 
+        is also entered), other lines if a block containing them is.
+        E.g., below, the block of 'out: x++;' ends with line 5, 
+        so line 4 only has the blocks of the loop.
+
+        >>> import tempfile
+        >>> dir_ = tempfile.mkdtemp()
+        >>> CM.vwrite(os.path.join(dir_, 'prog.c'), '\\n'.join([
+        ... 'int main(int argc, char **argv){',
+        ... '  int x = 0;',
+        ... '  if (argc > 1) goto out;',
+        ... '  do { x++; } while (x < 3); out: x++;',
+        ... '  return x;',
+        ... '}']))
+        >>> cmd = ("cd {} && gcc --coverage -c prog.c -o prog.o && "
+        ...        "gcc --coverage prog.o -o prog").format(dir_)
+        >>> _ = CM.vcmd(cmd)
+        >>> gcno = Gcno(os.path.join(dir_, 'prog.gcno'), dir_)
+        >>> def cmp_gcov(args):
+        ...     _ = CM.vcmd("cd {0} && rm -f prog.gcda && ./prog {1}; "
+        ...                 "gcov prog.o".format(dir_, args))
+        ...     sids = gcno.get_cov(os.path.join(dir_, 'prog.gcda'))
+        ...     assert sids == parse_gcov(os.path.join(dir_, 'prog.c.gcov'))
+        ...     return sorted(sids, key=lambda sid: int(sid.split(':')[1]))
+        >>> print cmp_gcov('')
+        ['prog.c:1', 'prog.c:2', 'prog.c:3', 'prog.c:4', 'prog.c:5']
+        >>> #the goto skips the loop, 'out: x++;' runs but line 4 is not executed
+        >>> print cmp_gcov('a')
+        ['prog.c:1', 'prog.c:2', 'prog.c:3', 'prog.c:5']
+        """
+        f = GcovFile(gcda_file, 'gcda')
+        assert f.stamp == self.stamp, \
+            "'{}' is not of the same build as the gcno".format(gcda_file)
+
+        fun = None
+        lines = set()  #of executed blocks
+        entered = set()  #lines whose blocks are entered from other blocks
+        for tag, n in f.records():
+            if tag == self.FUNCTION:
+                if not n:  #no data
+                    fun = None
+                    continue
+                ident = f.u32()
+                checksums = (f.u32(), f.u32())
+                fun = self.funs[ident]
+                assert fun[0] == checksums, (gcda_file, ident)
+            elif tag == self.ARC_COUNTS and fun:
+                if n < 0:  #not executed
+                    continue
+                counts = []
+                for _ in range(n // 8):
+                    lo, hi = f.u32(), f.u32()
+                    counts.append(lo | (hi << 32))
+                _, arcs, lines_d, enters = fun
+                bcounts, acounts = self.solve(arcs, counts)
+                for block, lines_ in lines_d.iteritems():
+                    if bcounts[block]:
+                        lines.update(lines_)
+                for n, lines_ in zip(acounts, enters):
+                    if n:
+                        entered.update(lines_)
+
+        lines = [l for l in lines if l not in self.block_lines or l in entered]
+        if src_files is not None:
+            lines = (l for l in lines if l[0] in src_files)
+        return set("{}:{}".format(src_file, line) for src_file, line in lines)
+
+    @staticmethod
+    def solve(arcs, counts):
+        """
+        Ret the counts of the blocks and arcs of a flow graph,
+        counts are of the arcs not on the spanning tree (in order),
+        the others are computed using flow conservation (as gcov does).
+
+        >>> #0 -> 2 -> (3 | 4) -> 5 -> 1, arcs 2->3 and 5->1 are counted
+        >>> arcs = [(0, 2, 1), (2, 3, 0), (2, 4, 1), (3, 5, 1), (4, 5, 1), (5, 1, 0)]
+        >>> Gcno.solve(arcs, [0, 1])
+        ([1, 1, 1, 0, 1, 1], [1, 0, 1, 0, 1, 1])
+        >>> Gcno.solve(arcs, [3, 3])
+        ([3, 3, 3, 3, 0, 3], [3, 3, 0, 3, 0, 3])
+        """
+        nblocks = 1 + max(max(src, dst) for src, dst, _ in arcs) if arcs else 0
+        outs = [[] for _ in range(nblocks)]
+        ins = [[] for _ in range(nblocks)]
+        nouts, nins = [0] * nblocks, [0] * nblocks  #unknown arcs
+        acounts = []
+        counts = iter(counts)
+        for i, (src, dst, on_tree) in enumerate(arcs):
+            outs[src].append(i)
+            ins[dst].append(i)
+            if on_tree:
+                acounts.append(None)
+                nouts[src] += 1
+                nins[dst] += 1
+            else:
+                acounts.append(next(counts))
+
+        bcounts = [None] * nblocks
+        todo = range(nblocks)
+        while todo:
+            b = todo.pop()
+            if bcounts[b] is None:
+                if outs[b] and not nouts[b]:
+                    bcounts[b] = sum(acounts[i] for i in outs[b])
+                elif ins[b] and not nins[b]:
+                    bcounts[b] = sum(acounts[i] for i in ins[b])
+                else:
+                    continue
+
+            for arcs_, narcs in ((outs[b], nouts), (ins[b], nins)):
+                if narcs[b] != 1:
+                    continue
+                i = next(i for i in arcs_ if acounts[i] is None)
+                acounts[i] = bcounts[b] - sum(acounts[j] for j in arcs_
+                                              if j != i)
+                src, dst, _ = arcs[i]
+                nouts[src] -= 1
+                nins[dst] -= 1
+                todo.extend((src, dst))
+
+        return bcounts, acounts
+
+def canonicalize_name(name, cwd):
+    """
+    Elide '.' and resolve '..' in name as gcov does for source names,
+    i.e., 'd/..' is only resolved if d exists (from cwd, where gcov runs).
+
+    >>> print canonicalize_name('./a//b.c', '/')
+    a/b.c
+    >>> print canonicalize_name('/usr/./lib/../lib/x.h', '/')
+    /usr/lib/x.h
+    >>> print canonicalize_name('../nodir/../b.c', '/tmp')
+    ../nodir/../b.c
+    """
+    result, slash = '', False
+    dd_base = 0  #result[:dd_base] cannot be resolved
+    for i, part in enumerate(name.split('/')):
+        if (not part and i) or part == '.':
+            continue
+        if part == '..':
+            if (len(result) == dd_base or 
+                not os.path.exists(os.path.join(cwd, result))):
+                dd_base = len(result) + 2 + slash
+            else:
+                k = result.rfind('/', dd_base)
+                result = result[:k if k >= 0 else dd_base]
+                slash = bool(result)
+                continue
+            
+        if slash:
+            result += '/'
+        result += part
+        slash = True
+    return result
+
 def check_data(data):
     assert isinstance(data,dict) 
     assert 'var_names' in data
@@ -106,6 +698,10 @@ def check_data(data):
 def get_cov_wrapper(config, data):
     """
     If anything happens, return to current directory
+
+    Note: os.chdir only affects the current process, so this is safe
+    when configs are evaluated concurrently by worker processes.
+    Anything written by get_cov_f should go to get_sandbox(data).
     """
     if __debug__:
         check_data(data)
@@ -119,3 +715,186 @@ def get_cov_wrapper(config, data):
     except:
         os.chdir(cur_dir)
         raise
+
+
+#Sandboxes, so that concurrent evaluation workers do not clobber each other
+_sandboxes_dirs = []  #(pid, dir) 
+def mk_sandboxes_dir(prefix):
+    """
+    Create a dir to contain the sandboxes of evaluation workers.
+    The dir is removed when the creating (main) process exits
+    (see cleanup).
+    """
+    import atexit
+    dir_ = tempfile.mkdtemp(prefix=prefix)
+    if not _sandboxes_dirs:
+        atexit.register(cleanup)
+    _sandboxes_dirs.append((os.getpid(), dir_))
+    return dir_
+
+def cleanup():
+    """
+    Rm the sandboxes dirs created by the current process.
+    This is done at exit, but processes exiting without atexit funcs,
+    e.g., those of CM.prun, must call it.
+
+    >>> dir_ = mk_sandboxes_dir('igen_test_')
+    >>> cleanup()
+    >>> os.path.exists(dir_)
+    False
+    """
+    pid = os.getpid()
+    for pid_, dir_ in _sandboxes_dirs:
+        if pid_ == pid and os.path.isdir(dir_):
+            CM.vrm(dir_)
+
+class Sandbox(object):
+    """
+    Private scratch dirs of an evaluation worker (process)
+    work_dir: where the *.gcov files of this worker are kept
+    gcda_dir: GCOV_PREFIX target, where the prog writes its *.gcda files
+    obj_dir: links to the *.gcno files of prog_dir and the collected *.gcda
+    """
+    def __init__(self, dir_, prog_dir):
+        assert os.path.isdir(dir_), dir_
+        assert os.path.isdir(prog_dir), prog_dir
+
+        self.dir_ = dir_
+        self.prog_dir = prog_dir
+        #shared by all sandboxes in the same sandboxes dir
+        self.lock_file = os.path.join(os.path.dirname(dir_), 'gcov.lock')
+        self.work_dir = os.path.join(dir_, 'work')
+        self.gcda_dir = os.path.join(dir_, 'gcda')
+        self.obj_dir = os.path.join(dir_, 'obj')
+        for d in (self.work_dir, self.gcda_dir, self.obj_dir):
+            os.mkdir(d)
+
+        for f in os.listdir(prog_dir):
+            if f.endswith('.gcno'):
+                os.symlink(os.path.join(prog_dir, f),
+                           os.path.join(self.obj_dir, f))
+
+        #strip all components of prog_dir,
+        #so that *.gcda files are written directly to gcda_dir
+        nstrip = len([p for p in prog_dir.split(os.sep) if p])
+        self.gcov_env = {'GCOV_PREFIX': self.gcda_dir,
+                         'GCOV_PREFIX_STRIP': str(nstrip)}
+
+        #prog_name -> Gcno (None if gcov is needed)
+        self.gcnos = {}
+
+    def __str__(self):
+        return "sandbox '{}' (prog_dir '{}')".format(self.dir_, self.prog_dir)
+
+    def cleanup(self):
+        cmd = "rm -rf {}/*.gcov {}/*.gcda {}/*".format(
+            self.work_dir, self.obj_dir, self.gcda_dir)
+        _ = run(cmd, 'cleanup')
+
+    def run(self, f):
+        """
+        Call f() with GCOV_PREFIX and GCOV_PREFIX_STRIP set to this sandbox
+        """
+        old_env = dict((k, os.environ.get(k)) for k in self.gcov_env)
+        os.environ.update(self.gcov_env)
+        try:
+            return f()
+        finally:
+            for k, v in old_env.iteritems():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+    def collect_gcda(self):
+        """
+        Move *.gcda files written under gcda_dir to obj_dir
+        (next to their *.gcno files) so that gcov can read them
+        """
+        for dir_, _, fs in os.walk(self.gcda_dir):
+            for f in fs:
+                if f.endswith('.gcda'):
+                    CM.vmv(os.path.join(dir_, f), os.path.join(self.obj_dir, f))
+
+    def gcov(self, prog_name, src_dir):
+        """
+        Run gcov on the *.gcda in obj_dir and keep the *.gcov in work_dir.
+
+        gcov must run from src_dir so that relative source paths
+        (recorded in *.gcno) resolve, and it writes *.gcov to its cwd.
+        Thus this (short) step is serialized among workers using a lock.
+        """
+        import fcntl
+        with open(self.lock_file, 'w') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                cmd = "rm -rf {}/*.gcov".format(src_dir)
+                _ = run(cmd, 'cleanup')
+                cmd = "cd {} && gcov {} -o {}".format(
+                    src_dir, prog_name, self.obj_dir)
+                _ = run(cmd, 'gcov')
+                for f in os.listdir(src_dir):
+                    if f.endswith(".gcov"):
+                        CM.vmv(os.path.join(src_dir, f),
+                               os.path.join(self.work_dir, f))
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def get_gcda(self, prog_name):
+        return os.path.join(self.obj_dir, prog_name + '.gcda')
+
+    def has_gcda(self, prog_name):
+        return os.path.isfile(self.get_gcda(prog_name))
+
+    def read_gcda(self, prog_name, src_dir, src_files=None):
+        """
+        Ret the sids of the *.gcda of prog_name in obj_dir, 
+        read directly using the *.gcno (no gcov run and lock), 
+        or None if the *.gcno format is not supported.
+        Sids are as those in the *.gcov written by gcov from src_dir.
+        """
+        try:
+            gcno = self.gcnos[prog_name]
+        except KeyError:
+            gcno_file = os.path.join(self.obj_dir, prog_name + '.gcno')
+            if Gcno.is_supported(gcno_file):
+                gcno = Gcno(gcno_file, src_dir)
+            else:
+                logger.warn("'{}': format not supported, use gcov"
+                            .format(gcno_file))
+                gcno = None
+            self.gcnos[prog_name] = gcno
+
+        if gcno is None:
+            return None
+
+        #serious error as in run_single, i.e., gcov "assuming not executed"
+        gcda_file = self.get_gcda(prog_name)
+        if not os.path.isfile(gcda_file):
+            raise AssertionError("'{}' not found, Check this serious error!"
+                                 .format(gcda_file))
+        return gcno.get_cov(gcda_file, src_files)
+
+    @property
+    def gcov_files(self):
+        return [os.path.join(self.work_dir, f)
+                for f in os.listdir(self.work_dir) if f.endswith(".gcov")]
+
+_sandboxes = {}
+def get_sandbox(data):
+    """
+    Ret the sandbox of the current process (create it if needed)
+    """
+    if __debug__:
+        check_data(data)
+        assert 'sandboxes_dir' in data
+        assert 'prog_dir' in data
+
+    #forked workers inherit _sandboxes, so also key on pid
+    key = (os.getpid(), data['prog_dir'])
+    if key not in _sandboxes:
+        dir_ = tempfile.mkdtemp(dir=data['sandboxes_dir'],
+                                prefix="{}_".format(os.getpid()))
+        _sandboxes[key] = Sandbox(dir_, data['prog_dir'])
+        logger.detail("create {}".format(_sandboxes[key]))
+    return _sandboxes[key]
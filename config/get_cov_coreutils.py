@@ -8,13 +8,19 @@ import get_cov as GC
 logger = CM.VLog('coreutils')
 logger.level = CC.logger_level
 
-def prepare(prog_name, get_dom_f, main_dir, doms_dir, do_perl):
+def prepare(prog_name, get_dom_f, main_dir, doms_dir, do_perl, sids=None,
+            ts_jobs=1):
+    """
+    sids (if given): only read the coverage of their source files
+    ts_jobs: run up to ts_jobs (independent) testsuite cmds at once
+    """
     if __debug__:
         assert isinstance(prog_name, str), prog_name
         assert callable(get_dom_f), get_dom_f        
         assert isinstance(main_dir, str), main_dir
         assert isinstance(doms_dir, str), doms_dir
         assert isinstance(do_perl, bool), do_perl
+        assert ts_jobs >= 1, ts_jobs
 
     main_dir = CM.getpath(main_dir)
     dom_dir = CM.getpath(doms_dir)    
@@ -52,7 +58,11 @@ def prepare(prog_name, get_dom_f, main_dir, doms_dir, do_perl):
             'dir_': dir_,
             'main_dir': main_dir,
             'prog_dir': prog_dir,
-            'scripts_dir': scripts_dir}
+            'scripts_dir': scripts_dir,
+            'src_files': GC.get_src_files(sids) if sids else None,
+            'ts_jobs': ts_jobs,
+            'sandboxes_dir': GC.mk_sandboxes_dir(
+                prefix="igen_sandboxes_{}_".format(prog_name))}
     get_cov_f = lambda config: GC.get_cov_wrapper(config, data)
     return dom, default_configs, get_cov_f
 
@@ -60,6 +70,7 @@ def check_data(data):
     GC.check_data(data)
     assert 'main_dir' in data
     assert 'prog_dir' in data
+    assert 'ts_jobs' in data
     
 def get_opts(config,ks):
     """
@@ -86,7 +97,8 @@ def get_ts_data(config, data):
     return {'prog': data['prog_exe'],
             'opts': get_opts(config, data['var_names']),
             'cdir': os.path.join(data['main_dir'], 'testfiles', 'common'),
-            'tdir': os.path.join(data['main_dir'], 'testfiles', data['prog_name'])}
+            'tdir': os.path.join(data['main_dir'], 'testfiles', data['prog_name']),
+            'jobs': data['ts_jobs']}
 
 def get_cov_perl(config, data):
     if __debug__:
@@ -106,24 +118,47 @@ def get_cov_gcov(config, data):
         assert isinstance(config, CC.Config),config        
         check_data(data)
         
-    #cleanup
-    cmd = "rm -rf {}/*.gcov {}/*.gcda".format(data['dir_'], data['prog_dir'])
-    _ = GC.run(cmd,'cleanup')
+    #*.gcda and *.gcov files are kept in a per-worker sandbox
+    sandbox = GC.get_sandbox(data)
+    sandbox.cleanup()
     
     #run testsuite
     ts = db[data['prog_name']](get_ts_data(config, data))
-    outps = ts.run()
+    outps = sandbox.run(ts.run)
+    sids = get_sids_gcov(sandbox, outps, data)
+    return sids, outps
 
-    #read traces from gcov
+def get_sids_gcov(sandbox, outps, data):
+    """
+    Ret the sids of the testsuite runs (with outputs outps) in sandbox,
+    and CC.timeout_sid if some runs are killed.
+    Killed runs write no *.gcda, thus there is none if all are killed.
+
+    >>> import tempfile
+    >>> dir_, prog_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    >>> os.mkdir(os.path.join(dir_, 's'))
+    >>> sandbox = GC.Sandbox(os.path.join(dir_, 's'), prog_dir)
+    >>> data = {'prog_name': 'prog', 'dir_': prog_dir, 'src_files': None}
+    >>> sorted(get_sids_gcov(sandbox, set(['12', CC.timeout_sid]), data))
+    ['@timeout']
+    """
+    #read traces from the *.gcda (gcov if not supported)
     #/path/prog.Linux.exe -> prog
-    cmd = "gcov {} -o {}".format(data['prog_name'], data['prog_dir'])
-    _ = GC.run(cmd, 'gcov')
-    
-    gcov_dir = os.getcwd()
-    sids = (GC.parse_gcov(os.path.join(gcov_dir,f))
-            for f in os.listdir(gcov_dir) if f.endswith(".gcov"))
-    sids = set(CM.iflatten(sids))
-    return sids, outps
+    sandbox.collect_gcda()
+    timed_out = CC.timeout_sid in outps
+    if timed_out and not sandbox.has_gcda(data['prog_name']):
+        sids = set()
+    else:
+        sids = sandbox.read_gcda(
+            data['prog_name'], data['dir_'], data['src_files'])
+        if sids is None:
+            sandbox.gcov(data['prog_name'], data['dir_'])
+            sids = (GC.parse_gcov(f, data['src_files'])
+                    for f in sandbox.gcov_files)
+            sids = set(CM.iflatten(sids))
+    if timed_out:
+        sids.add(CC.timeout_sid)
+    return sids
 
 def check_ts_data(data):
     assert isinstance(data,dict) 
@@ -131,9 +166,14 @@ def check_ts_data(data):
     assert 'opts' in data
     assert 'cdir' in data
     assert 'tdir' in data
+    assert 'jobs' in data
     
 class TestSuite_COREUTILS(object):
     __metaclass__ = abc.ABCMeta
+
+    #cmds only read the test files and so can run concurrently
+    independent = True
+    
     def __init__(self,data):
         if __debug__:
             check_ts_data(data),data
@@ -142,20 +182,26 @@ class TestSuite_COREUTILS(object):
         self.opts = data['opts']
         self.cdir = data['cdir']
         self.tdir = data['tdir']
+        self.jobs = data['jobs']
 
     @abc.abstractmethod
     def get_cmds(self): pass
 
     def run(self):
         cmds = self.get_cmds()
-        outps = GC.run(cmds,'run testsuite')
+        outps = GC.run(cmds,'run testsuite',
+                       jobs=self.jobs if self.independent else 1,
+                       limits=True)
         return outps
 
     def run_perl(self, script_cmd):
         cmds = self.get_cmds()
         sids = []
         for cmd in cmds:
-            sids_ = GC.run_runscript(script_cmd, cmd)
+            try:
+                sids_ = GC.run_runscript(script_cmd, cmd)
+            except GC.Timeout:
+                sids_ = set([CC.timeout_sid])
             sids.append(sids_)
         return sids
 
@@ -243,6 +289,9 @@ class TS_mv(TestSuite_COREUTILS):
     (0,1,51), (1,9,36), (2,3,53), (3,3,10), (4,1,1)  
     (0,1,51), (1,9,36), (2,3,53), (3,4,11)
     """
+    #each cmd resets and changes tdir
+    independent = False
+    
     def get_cmds(self):
         cmds = []
         cmds.append("rm -rf {}/* ;".format(self.tdir) +
@@ -327,6 +376,9 @@ class TS_ln(TestSuite_COREUTILS):
     cov 182
     (0,1,13), (1,9,42), (2,3,41), (3,3,8), (4,4,63), (5,1,3), (6,6,9), (7,2,3)
     """
+    #each cmd resets and changes tdir
+    independent = False
+    
     def get_cmds(self):
         cmds = []
         cmds = []
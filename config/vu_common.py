@@ -611,6 +611,77 @@ def vcmd(cmd, inp=None, shell=True):
     proc = sp.Popen(cmd,shell=shell,stdin=sp.PIPE,stdout=sp.PIPE,stderr=sp.PIPE)
     return proc.communicate(input=inp)
 
+def vcmd_limit(cmd, inp=None, shell=True, timeout=None, cpu=None, mem=None):
+    """
+    As vcmd, but cmd runs in its own process group, 
+    which is killed after timeout secs (wall-clock), 
+    and with at most cpu secs of cpu time and mem MB of memory.
+    Ret (outp, err, exceeded), exceeded is 'timeout' if cmd was killed
+    by the timer or by SIGXCPU (the cpu limit), 'mem' if it failed 
+    to allocate within the mem limit (killed by a signal or 
+    reporting an out of memory error), and None otherwise.
+
+    >>> vcmd_limit('echo a; sleep 5; echo b', timeout=0.5)
+    ('a\\n', '', 'timeout')
+    >>> vcmd_limit('while :; do :; done', cpu=1)[2]
+    'timeout'
+    >>> vcmd_limit(['echo', 'a'], shell=False, timeout=5, cpu=5, mem=512)
+    ('a\\n', '', None)
+    >>> vcmd_limit('kill -9 $$', cpu=5)[2]  #not a timeout
+    >>> vcmd_limit('exit 3', mem=512)[2]
+    >>> import sys
+    >>> vcmd_limit([sys.executable, '-c', 'x = " " * 2**30'], shell=False, mem=128)[2]
+    'mem'
+    """
+    import resource
+    import signal
+    import threading
+    
+    def preexec_f():
+        os.setsid()
+        if cpu:  #SIGXCPU, then SIGKILL a sec later
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+        if mem:
+            n = mem * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (n, n))
+
+    proc = sp.Popen(cmd,shell=shell,stdin=sp.PIPE,stdout=sp.PIPE,stderr=sp.PIPE,
+                    preexec_fn=preexec_f)
+    killed = []
+    def kill_f():
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+            killed.append(proc.pid)
+        except OSError:  #already done
+            pass
+        
+    timer = threading.Timer(timeout, kill_f) if timeout else None
+    if timer:
+        timer.start()
+    try:
+        outp, err = proc.communicate(input=inp)
+    finally:
+        if timer:
+            timer.cancel()
+            
+    #the shell (if any) may report the signal as 128 + n
+    rc = proc.returncode
+    if killed or (cpu and rc in (-signal.SIGXCPU, 128 + signal.SIGXCPU)):
+        return outp, err, 'timeout'
+
+    #failed allocations often end in these signals (e.g., dereferencing
+    #the NULL of malloc, the oom killer) or in out of memory messages
+    if mem and rc:
+        sigs = (signal.SIGKILL, signal.SIGSEGV, signal.SIGABRT, signal.SIGBUS)
+        errs = ("out of memory", "memory exhausted", "cannot allocate memory",
+                "memoryerror", "bad_alloc")
+        err_ = err.lower()
+        if (rc in sigs or -rc in sigs or rc - 128 in sigs or 
+            any(e in err_ for e in errs)):
+            return outp, err, 'mem'
+        
+    return outp, err, None
+
 def vcmd1(cmd):
     import shlex
     proc = sp.Popen(shlex.split(cmd),stdout=sp.PIPE)
@@ -837,6 +908,115 @@ def get_workloads(tasks,max_nprocesses,chunksiz):
 
     return workloads
 
+_pmap_fs = {}  #key -> f of the live PMaps (set before forking workers)
+def _pmap_call((key, task)): return _pmap_fs[key](task)
+
+class PMap(object):
+    """
+    A pool of nprocesses worker processes to call f on tasks, 
+    which (unlike pmap) can be used many times.
+    Workers are forked once, so their states (e.g., servers started by f)
+    last until close().
+
+    >>> pm = PMap(lambda x: (x*x, os.getpid()), 2)
+    >>> rs1, rs2 = pm(range(5)), pm(range(3))
+    >>> [r for r, _ in rs1 + rs2]
+    [0, 1, 4, 9, 16, 0, 1, 4]
+    >>> pids = set(pid for _, pid in rs1 + rs2)
+    >>> len(pids) <= 2 and os.getpid() not in pids
+    True
+    >>> pm.close()
+    """
+    nkeys = 0
+    
+    def __init__(self, f, nprocesses):
+        assert callable(f), f
+        assert nprocesses >= 1, nprocesses
+
+        import multiprocessing
+        PMap.nkeys += 1
+        self.key = PMap.nkeys
+        _pmap_fs[self.key] = f
+        self.pool = multiprocessing.Pool(nprocesses)
+
+    def __call__(self, tasks):
+        """
+        Like map(f, tasks), results are in the same order as tasks
+        """
+        assert self.pool, 'closed'
+        return self.pool.map(_pmap_call, [(self.key, task) for task in tasks],
+                             chunksize=1)
+
+    def close(self):
+        if self.pool is None:
+            return
+        self.pool.terminate()
+        self.pool.join()
+        self.pool = None
+        del _pmap_fs[self.key]
+        
+def pmap(f, tasks, nprocesses):
+    """
+    Like map(f, tasks) but use nprocesses worker processes.
+    Workers are forked after f is set, so f can be any callable
+    (e.g., a lambda or closure), only tasks and results are pickled.
+    Results are in the same order as tasks.
+
+    >>> pmap(lambda x: x*x, range(7), 3)
+    [0, 1, 4, 9, 16, 25, 36]
+    >>> pmap(lambda x: x*x, range(7), 1)
+    [0, 1, 4, 9, 16, 25, 36]
+    >>> pmap(lambda x: x, [], 3)
+    []
+    """
+    assert callable(f), f
+    assert nprocesses >= 1, nprocesses
+
+    tasks = list(tasks)
+    if nprocesses == 1 or len(tasks) <= 1:
+        return map(f, tasks)
+
+    pm = PMap(f, min(nprocesses, len(tasks)))
+    try:
+        return pm(tasks)
+    finally:
+        pm.close()
+
+def prun(f, tasks, nprocesses):
+    """
+    Call f(task) for each task in its own (forked) process, 
+    running at most nprocesses of them at once.
+    Unlike pmap, the processes are not daemonic, so f can use pmap
+    (e.g., to eval configs), but results are not returned:
+    ret the exit codes of the processes, in the same order as tasks.
+
+    >>> prun(lambda x: pmap(lambda y: y, [x, x], 2), range(4), 2)
+    [0, 0, 0, 0]
+    >>> prun(lambda x: os._exit(x), [0, 3, 0], 2)
+    [0, 3, 0]
+    """
+    assert callable(f), f
+    assert nprocesses >= 1, nprocesses
+    
+    import multiprocessing
+    import time
+    tasks = list(tasks)
+    procs = [multiprocessing.Process(target=f, args=(task,))
+             for task in tasks]
+    todos = procs[::-1]
+    runs = []
+    while todos or runs:
+        while todos and len(runs) < nprocesses:
+            p = todos.pop()
+            p.start()
+            runs.append(p)
+        time.sleep(0.05)
+        runs = [p for p in runs if p.is_alive()]
+        
+    for p in procs:
+        p.join()
+    return [p.exitcode for p in procs]
+
 def callMultiF(f,n,cache):
     """
     Try to get n unique results by calling f() multiple times
@@ -24,14 +24,14 @@ class Dom(CC.Dom):
         for k in config:
             vs = self[k] - set(config[k])
             for v in vs:
-                new_config = Config(config)
-                new_config[k] = v
+                new_config = Config((k_, v if k_ == k else v_)
+                                    for k_, v_ in config.iteritems())
                 if new_config not in configs_d:
                     new_configs.append(new_config)
         return new_configs
                 
 class Config(CC.Config):
-    pass
+    __slots__ = ()
 
 class Configs_d(CC.Configs_d):
     pass
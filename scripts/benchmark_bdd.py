@@ -0,0 +1,74 @@
+"""
+Compare the z3 and decision diagram (bdd, see CC.BddDB) checks of
+interactions on saved runs, i.e., the results dirs of igen.py.
+
+$ cd $IGEN
+$ PYTHONPATH=config:src python -O scripts/benchmark_bdd.py \
+  /var/tmp/igen_1_normal_noname_hPVkLt /var/tmp/igen_3_normal_noname_16OTNe
+
+For the cores of each iteration, this simplifies (Cores_d.analyze) and
+merges (Cores_d.merge) them as in the replay analysis, then applies
+MinConfigs.indep (prune/pack) and Precision.check_existing to the final
+results.  Both backends should give the same results.
+"""
+import argparse
+import os.path
+from time import time
+
+import vu_common as CM
+import config_common as CC
+import alg
+import analysis
+import analysis_algs
+
+def run(ld):
+    st = time()
+    ld._z3db = CC.Z3DB(ld.dom)  #no cached exprs
+    rs = []
+    covs_d = CC.Covs_d()
+    for dt in sorted(ld.dts, key=lambda dt: dt.citer):
+        for config, cov in dt.cconfigs_d.iteritems():
+            for sid in cov:
+                covs_d.add(sid, config)
+        pp_cores_d = dt.cores_d.analyze(ld.dom, ld.z3db, covs_d)
+        mcores_d = pp_cores_d.merge(ld.dom, ld.z3db)
+        rs.append(str(mcores_d))
+
+    ld.pp_cores_d = pp_cores_d
+    ld.mcores_d = mcores_d
+    d = analysis_algs.MinConfigs(ld).indep(set(pp_cores_d.itervalues()))
+    rs.append(sorted(map(analysis_algs.MinConfigs.str_of_pack, d)))
+    equivs, nones = analysis_algs.Precision(ld).check_existing()
+    rs.append((str(equivs), str(nones)))
+    return time() - st, rs
+
+def get_run_dirs(dir_):
+    stat = analysis.Analysis.get_dir_stat(dir_)
+    if stat == analysis.Analysis.RUNDIR:
+        return [dir_]
+    elif stat == analysis.Analysis.BENCHMARKDIR:
+        return sorted(os.path.join(dir_, d) for d in os.listdir(dir_))
+    else:
+        raise AssertionError("'{}' is not a results dir".format(dir_))
+
+if __name__ == "__main__":
+    aparser = argparse.ArgumentParser("benchmark z3 and bdd checks")
+    aparser.add_argument("dirs", nargs='+')
+    args = aparser.parse_args()
+
+    for l in (alg.logger, analysis.logger, analysis_algs.logger):
+        l.level = CM.VLog.WARN
+
+    for dir_ in args.dirs:
+        for run_dir in get_run_dirs(CM.getpath(dir_)):
+            ld = analysis.LoadData.load_dir(run_dir)
+            ts, rss = [], []
+            for use_bdd in (False, True):
+                CC.use_bdd = use_bdd
+                t, rs = run(ld)
+                ts.append(t)
+                rss.append(rs)
+
+            print "{} ({} iters, {} sids): z3 {:.2f}s, bdd {:.2f}s{}".format(
+                run_dir, len(ld.dts), len(ld.pp_cores_d), ts[0], ts[1],
+                '' if rss[0] == rss[1] else ', DIFF results')
@@ -0,0 +1,55 @@
+"""
+Compare the solver (smt) and random-completion (rand) generators of
+cex configs (Dom.gen_configs_cex) on some domains.
+
+$ cd $IGEN
+$ PYTHONPATH=config:src python -O scripts/benchmark_cex.py \
+  benchmarks/doms/doms_gnu_coreutils/ls.dom benchmarks/doms/buysbox/busybox.dom
+
+Each round selects a core from a random existing config and generates
+the cex configs of that core, which then become existing configs,
+similar to the iterations of iGen.
+"""
+import argparse
+import random
+from time import time
+
+import vu_common as CM
+import config_common as CC
+import alg
+
+def run(dom, z3db, rounds, core_siz, seed):
+    random.seed(seed)
+    configs_d = CC.Configs_d()
+    for c in dom.gen_configs_tcover1(config_cls=alg.Config):
+        configs_d[c] = frozenset()
+
+    st = time()
+    for _ in range(rounds):
+        config = random.choice(configs_d.keys())
+        ks = random.sample(dom.keys(), min(core_siz, len(dom)))
+        core = alg.Core((k, frozenset([config[k]])) for k in sorted(ks))
+        sel_core = alg.SCore((core, None))
+        for c in dom.gen_configs_cex(sel_core, configs_d, z3db):
+            configs_d[c] = frozenset()
+    return time() - st, len(configs_d)
+
+if __name__ == "__main__":
+    aparser = argparse.ArgumentParser("benchmark cex config generators")
+    aparser.add_argument("dom_files", nargs='+')
+    aparser.add_argument("--rounds", "-rounds", type=int, default=20)
+    aparser.add_argument("--core_siz", "-core_siz", type=int, default=3)
+    aparser.add_argument("--seed", "-seed", type=int, default=0)
+    args = aparser.parse_args()
+
+    for dom_file in args.dom_files:
+        dom, _ = alg.Dom.get_dom(CM.getpath(dom_file))
+        rs = []
+        for rand_cex in (False, True):
+            CC.rand_cex = rand_cex
+            z3db = CC.Z3DB(dom)
+            t, nconfigs = run(dom, z3db, args.rounds, args.core_siz, args.seed)
+            rs.append("{} {:.2f}s ({} configs)".format(
+                'rand' if rand_cex else 'smt', t, nconfigs))
+
+        print "{} ({} opts): {}".format(dom_file, len(dom), ', '.join(rs))
@@ -1,5 +1,12 @@
+from time import time
 import os.path
 import random
+import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 import z3
 import z3util
@@ -51,11 +58,12 @@ class Dom(CC.Dom):
         self._infs = infs
 
     
-    def gen_configs_cex(self, sel_core, existing_configs, z3db):
+    def gen_configs_cex(self, sel_core, existing_configs, z3db,
+                        configs=None):
         """
         >>> dom = Dom([('a', frozenset(['1', '0'])), \
         ('b', frozenset(['1', '0'])), ('c', frozenset(['1', '0', '2']))])
-        >>> z3db = dom.z3db
+        >>> z3db = CC.Z3DB(dom)
 
         >>> c1 = Config([('a', '0'), ('b', '0'), ('c', '0')])
         >>> c2 = Config([('a', '0'), ('b', '0'), ('c', '1')])
@@ -95,17 +103,30 @@ class Dom(CC.Dom):
         >>> print config
         a=1 b=1 c=2
 
+        >>> sel_core = SCore((Core([('c',frozenset(['0']))]), None))
+        >>> print dom.gen_configs_cex(sel_core, configs, z3db)[0]
+        a=1 b=1 c=2
+
+        >>> sel_core = SCore((Core([('a',frozenset(['1'])), ('b',frozenset(['1']))]), None))
+        >>> configs = dom.gen_configs_cex(sel_core, [c12], z3db)
+        >>> assert len(configs) == len(set(configs)) == 2 and c12 not in configs
+        >>> configs_ = dom.gen_configs_cex(sel_core, [c12], z3db, configs[:1])
+        >>> assert len(configs_) == len(set(configs_)) == 3 and c12 not in configs_
+        >>> assert configs_[0] == configs[0]
+        >>> assert all(c['a'] == '0' or c['b'] == '0' for c in configs)
 
         sel_core = (c_core,s_core)
         create counterexample configs by changing settings in c_core,
         but these configs must satisfy s_core
         x=0,y=1  =>  [x=0,y=0,z=rand;x=0,y=2,z=rand;x=1,y=1;z=rand]
+
+        configs (if given) are new configs, e.g., of other sel cores,
+        the cex configs are different from these and added to them.
         """
         
         assert isinstance(sel_core, SCore), sel_core
         assert isinstance(z3db, CC.Z3DB)
         
-        configs = []
         c_core, s_core = sel_core
 
         #keep
@@ -126,24 +147,85 @@ class Dom(CC.Dom):
                         new_core[sk] = sv
                 changes.append(new_core)
 
-        e_configs = [c.z3expr(z3db) for c in existing_configs]
-        for changed_core in changes:
-            yexpr = changed_core.z3expr(z3db, z3util.myAnd)
-            nexpr = z3util.myOr(e_configs)
-            configs_ = self.gen_configs_exprs([yexpr],[nexpr],k=1, config_cls=Config)
-            if not configs_:
-                continue
-            config=configs_[0]
+        if CC.rand_cex:
+            return self.gen_configs_cex_rand(
+                changes, existing_configs, z3db, configs)
+        else:
+            return self.gen_configs_cex_smt(
+                changes, existing_configs, z3db, configs)
+
+    def gen_configs_cex_smt(self, changes, existing_configs, z3db,
+                            configs=None):
+        """
+        For each core in changes, create a config satisfying the core
+        that is not in existing_configs or configs (the new configs).
+        """
+        if configs is None:
+            configs = []
+            
+        #existing configs are blocked permanently, new ones only in this call
+        solver = z3db.block_solver(existing_configs)
+        solver.push()
+        try:
+            for config in configs:
+                solver.add(z3.Not(config.z3expr(z3db)))
             
-            assert config.c_implies(changed_core)
-            assert config not in existing_configs, \
-                ("ERR: gen existing config {}".format(config))
-                     
-            configs.append(config)
-            e_configs.append(config.z3expr(z3db))
+            for changed_core in changes:
+                yexpr = changed_core.z3expr(z3db, z3util.myAnd)
+                solver.push()
+                solver.add(yexpr)
+                config = self.config_of_solver(solver, Config)
+                solver.pop()
+                if config is None:
+                    continue
+
+                assert config.c_implies(changed_core)
+                assert config not in existing_configs, \
+                    ("ERR: gen existing config {}".format(config))
+
+                configs.append(config)
+                solver.add(z3.Not(config.z3expr(z3db)))
+        finally:
+            solver.pop()
 
         return configs
 
+    def gen_configs_cex_rand(self, changes, existing_configs, z3db,
+                             configs=None, ntries=100):
+        """
+        Like gen_configs_cex_smt but fix the settings of the core and 
+        randomly choose the rest, which is enough for domains without 
+        constraints among options. Use the solver only if no new config 
+        is found after ntries (e.g., when most configs are existing).
+
+        >>> dom = Dom([('a', frozenset(['1', '0'])), ('b', frozenset(['1', '0']))])
+        >>> z3db = CC.Z3DB(dom)
+        >>> configs = [Config([('a', '1'), ('b', '0')])]
+        >>> changes = [Core([('a', frozenset(['1']))]), Core([('a', frozenset(['1']))])]
+        >>> print '\\n'.join(map(str, dom.gen_configs_cex_rand(changes, configs, z3db)))
+        a=1 b=1
+        """
+        if configs is None:
+            configs = []
+        seen = set(configs)
+        for changed_core in changes:
+            settings = [(k, list(changed_core[k] if k in changed_core
+                                 else vs))
+                        for k, vs in self.iteritems()]
+            for _ in range(ntries):
+                config = Config((k, random.choice(vs)) for k, vs in settings)
+                if config not in seen and config not in existing_configs:
+                    configs.append(config)
+                    seen.add(config)
+                    break
+            else:
+                n = len(configs)
+                configs = self.gen_configs_cex_smt(
+                    [changed_core], existing_configs, z3db, configs)
+                seen.update(configs[n:])
+                
+        return configs
+
     @classmethod
     def get_dom(cls, dom_file):
         """
@@ -222,16 +304,17 @@ class Config(CC.Config):
     >>> dom = Dom([('a',frozenset(['1','2'])),\
     ('b',frozenset(['0','1'])),\
     ('c',frozenset(['0','1','2']))])
-    >>> c.z3expr(dom.z3db)
+    >>> c.z3expr(CC.Z3DB(dom))
     And(a == 1, b == 0, c == 1)
     """
+    __slots__ = ()
 
     def real(self, dom):
         assert dom.infs
         
         config = [(k, dom.mkConcr(v) if k in dom.infs else v)
                   for k,v  in self.iteritems()]
-        return self.__class__(config)
+        return self.mk_raw(config)
     
 
     def c_implies(self, core):
@@ -255,31 +338,81 @@ class Config(CC.Config):
                 any(k in self and self[k] in core[k] for k in core))
 
     @classmethod
-    def eval(cls, configs, get_cov_f, dom):
+    def eval(cls, configs, get_cov_f, dom, jobs=1, cov_cache=None,
+             costs=None, pool=None):
         """
         Eval (e.g., get coverage) configurations using function get_cov_f
         Ret a list of configs and their results
+
+        If jobs > 1 then evaluate configs concurrently using jobs processes,
+        or using pool (a CM.PMap of Config.eval_f with get_cov_f) if given,
+        whose workers are reused by all calls, e.g., of a run.
+        Results are in the same (deterministic) order regardless of jobs.
+
+        If cov_cache then reuse its stored results and store new ones
+        (except timeouts, which depend on the limits).
+
+        If costs (a dict) then add the cost (secs, outcome) of each
+        evaluated (not cached) config, outcome is 'ok', 'empty' 
+        (no results) or 'timeout'.
         """
         assert (isinstance(configs, list) and
                 all(isinstance(c, (cls, CC.Config)) for c in configs)
                 and configs), configs
         assert callable(get_cov_f), get_cov_f
         assert isinstance(dom, Dom)
-        
-        def eval_f(c):
-            sids, outps = get_cov_f(c)
-            rs = outps if CC.analyze_outps else sids
-            if not rs:
-                logger.warn("'{}' produces nothing".format(c))
-            return rs
-
-        results = []
-        configs = set(configs)
+        assert isinstance(jobs, int) and jobs >= 1, jobs
+        assert cov_cache is None or isinstance(cov_cache, CC.CovCache)
+        assert costs is None or isinstance(costs, dict), costs
+        assert pool is None or isinstance(pool, CM.PMap), pool
+
+        configs = list(set(configs))
+
+        #results of infs configs depend on their random real values
+        if cov_cache and not dom.infs:
+            cached = [(c, cov_cache.get(c)) for c in configs]
+            cached = dict((c, rs) for c, rs in cached if rs is not None)
+        else:
+            cached = {}
+        todos = [c for c in configs if c not in cached]
+
+        #real() uses random, so do it here to keep seeds reproducible
         if dom.infs:
-            results = [(c, eval_f(c.real(dom))) for c in configs]
+            todos_ = [c.real(dom) for c in todos]
         else:
-            results = [(c, eval_f(c)) for c in configs]
+            todos_ = todos
+
+        if jobs > 1:
+            logger.detail("eval {} configs using {} jobs"
+                          .format(len(todos), jobs))
+        if pool:
+            rss = pool(todos_)
+        else:
+            rss = CM.pmap(lambda c: cls.eval_f(get_cov_f, c), todos_, jobs)
+        results = dict((c, rs) for c, (rs, _) in zip(todos, rss))
+        if costs is not None:
+            for c, (rs, secs) in zip(todos, rss):
+                costs[c] = (secs, 'timeout' if CC.timeout_sid in rs else
+                            'ok' if rs else 'empty')
+        if cov_cache and not dom.infs and todos:
+            cov_cache.put([(c, rs) for c, rs in results.iteritems()
+                           if CC.timeout_sid not in rs])
+        results.update(cached)
+
+        results = [(c, results[c]) for c in configs]
         return results
+
+    @staticmethod
+    def eval_f(get_cov_f, c):
+        """
+        Ret the results of c and its eval time
+        """
+        st = time()
+        sids, outps = get_cov_f(c)
+        rs = outps if CC.analyze_outps else sids
+        if not rs:
+            logger.warn("'{}' produces nothing".format(c))
+        return rs, time() - st
     
 
 class Core(HDict):
@@ -495,21 +628,45 @@ class PNCore(MCore):
                   zip('pc pd nc nd'.split(),self) if c is not None)
             return '; '.join(ss)
 
-    def verify(self, configs, dom):
+    def verify(self, configs, dom, cmatrix=None):
+        """
+        Check the cores against configs using the matrix cmatrix
+        (configs not in cmatrix are added to it)
+
+        >>> dom = Dom([('x',frozenset(['0','1'])),('y',frozenset(['0','1']))])
+        >>> pc = Core([('x',frozenset(['1']))])
+        >>> pd = Core([('y',frozenset(['0']))])
+        >>> configs = [Config([('x','1'),('y','1')]), Config([('x','1'),('y','0')])]
+        >>> logger.level = CM.VLog.WARN
+        >>> print PNCore((pc, pd, Core(), Core())).verify(configs, dom)
+        pc: x=1; nc: true; nd: true
+        >>> print PNCore((pc, pd, Core(), Core())).verify(configs[:1], dom)
+        pc: x=1; pd: y=0; nc: true; nd: true
+        """
         assert self.pc is not None, self.pc #this never happens
         #nc is None => pd is None
         assert self.nc is not None or self.pd is None, (self.nc, self.nd)
         assert (all(isinstance(c, Config) for c in configs) and configs), configs
         assert isinstance(dom, Dom), dom
+        assert cmatrix is None or isinstance(cmatrix, ConfigsMatrix), cmatrix
 
+        if cmatrix is None:
+            cmatrix = ConfigsMatrix(dom)
+        bits = cmatrix.bits_of_rows([cmatrix.add(c) for c in configs])
+        
+        #configs => core
+        def _implies(core, is_and, neg=False):
+            return bits & ~cmatrix.implies_bits(core, is_and, neg)
+        def implies(core, is_and, neg=False):
+            return not _implies(core, is_and, neg)
+        
         pc, pd, nc, nd = self
 
         #traces => pc & neg(pd)
-        assert not pc or all(c.c_implies(pc) for c in configs), pc
+        assert not pc or implies(pc, is_and=True), pc
 
         if pd:
-            pd_n = pd.neg(dom)
-            if not all(c.d_implies(pd_n) for c in configs):
+            if not implies(pd, is_and=False, neg=True):
                 logger.debug('pd {} invalid'.format(pd))
                 pd = None
 
@@ -517,19 +674,17 @@ class PNCore(MCore):
         #pos traces => neg(nc & neg(nd))
         #pos traces => nd | neg(nc) 
         if nc and not nd:
-            nc_n = nc.neg(dom)
-            if not all(c.d_implies(nc_n) for c in configs):
+            if not implies(nc, is_and=False, neg=True):
                 logger.debug('nc {} invalid'.format(nc))
                 nc = None
         elif not nc and nd:
-            if not all(c.c_implies(nd) for c in configs):
+            if not implies(nd, is_and=True):
                 logger.debug('nd {} invalid'.format(nd))
                 nd = None
         elif nc and nd:
-            nc_n = nc.neg(dom)        
-            if not all(c.c_implies(nd) or
-                       c.d_implies(nc_n) for c in configs):
-                logger.debug('nc {} & nd {} invalid').format(nc,nd)
+            if (_implies(nd, is_and=True) &
+                _implies(nc, is_and=False, neg=True)):
+                logger.debug('nc {} & nd {} invalid'.format(nc,nd))
                 nc = None
                 nd = None
 
@@ -634,13 +789,23 @@ class PNCore(MCore):
             
             assert pexpr is not None
             assert nexpr is not None
+
+            if CC.use_bdd:
+                bdddb = z3db.bdddb
+                pf = PNCore._get_bdd(pc, pd, dom, bdddb, is_and=True)
+                nf = PNCore._get_bdd(nd, nc, dom, bdddb, is_and=False)
+                implies = lambda f, g: bdddb.implies(f, g)
+            else:
+                pf, nf = pexpr, nexpr
+                implies = lambda f, g: z3util.is_tautology(
+                    z3.Implies(f, g), z3db.solver)
             
-            if z3util.is_tautology(z3.Implies(pexpr, nexpr), z3db.solver):
+            if implies(pf, nf):
                 nc = None
                 nd = None
                 expr = pexpr
                 vstr = pvstr
-            elif z3util.is_tautology(z3.Implies(nexpr, pexpr), z3db.solver):
+            elif implies(nf, pf):
                 pc = None
                 pd = None
                 expr = nexpr
@@ -694,11 +859,65 @@ class PNCore(MCore):
         z3db.add(self, expr)
         return expr
 
+    @staticmethod
+    def _get_bdd(cc, cd, dom, bdddb, is_and):
+        #see _get_expr
+        k = (cc, cd, is_and)
+        if k in bdddb.cache: return bdddb.cache[k]
+
+        fs = []
+        if cc:
+            fs.append(bdddb.expr_of_dict_dict(cc, is_and=True))
+        if cd:
+            fs.append(bdddb.expr_of_dict_dict(cd.neg(dom), is_and=False))
+
+        myf = bdddb.myAnd if is_and else bdddb.myOr
+        f = myf(fs)
+
+        bdddb.cache[k] = f
+        return f
+
+    def bdd(self, dom, bdddb):
+        """
+        Canonical form of z3expr, i.e., equivalent exprs have the same
+        node (true is also None).  Raise KeyError if some settings are
+        not in the dom of bdddb.
+
+        >>> dom = Dom([('x',frozenset(['0','1'])),('y',frozenset(['0','1']))])
+        >>> bdddb = CC.BddDB(dom)
+        >>> x1, y0 = Core([('x',frozenset(['1']))]), Core([('y',frozenset(['0']))])
+        >>> x1y1 = Core([('x',frozenset(['1'])),('y',frozenset(['1']))])
+
+        x=1 & y=1 is pc: x=1 & neg(pd: y=0), and neg(nc: x=1 y=1) | (nd: false)
+        >>> c1 = PNCore((x1, y0, None, None))
+        >>> c2 = PNCore((x1y1, None, None, None))
+        >>> c3 = PNCore((None, None, x1y1.neg(dom), None))
+        >>> c1.bdd(dom, bdddb) == c2.bdd(dom, bdddb) != c3.bdd(dom, bdddb)
+        True
+        >>> PNCore((Core(), None, None, None)).bdd(dom, bdddb) is None
+        True
+        """
+        if self in bdddb.cache:
+            return bdddb.cache[self]
+
+        pc,pd,nc,nd = self
+        if pc is None and pd is None:
+            f = PNCore._get_bdd(nd, nc, dom, bdddb, is_and=False)
+        elif nc is None and nd is None:
+            f = PNCore._get_bdd(pc, pd, dom, bdddb, is_and=True)
+        else:
+            pf = PNCore._get_bdd(pc, pd, dom, bdddb, is_and=True)
+            nf = PNCore._get_bdd(nd, nc, dom, bdddb, is_and=False)
+            f = bdddb.myAnd([pf, nf])
+
+        bdddb.cache[self] = f
+        return f
+
 class Cores_d(CC.CustDict):
     """
     rare case when diff c1 and c2 became equiv after simplification
     >>> dom = Dom([('a',frozenset(['0','1'])),('b',frozenset(['0','1']))])
-    >>> z3db = dom.z3db
+    >>> z3db = CC.Z3DB(dom)
 
     c1 = a & b
     >>> pc = Core([('a',frozenset('1'))])
@@ -725,6 +944,11 @@ class Cores_d(CC.CustDict):
     >>> print cores_d.merge(dom, z3db)
     1. (2) pc: a=1; pd: b=0; nc: true; nd: true: (2) L1,L2
 
+    >>> CC.use_bdd = True
+    >>> print cores_d.merge(dom, z3db)
+    1. (2) pc: a=1; pd: b=0; nc: true; nd: true: (2) L1,L2
+    >>> CC.use_bdd = False
+
     >>> covs_d = CC.Covs_d()
     >>> config = Config([('a', '1'), ('b', '1')])
     >>> covs_d.add('L1',config)
@@ -741,11 +965,20 @@ class Cores_d(CC.CustDict):
 
     """
     def __setitem__(self,sid,pncore):
-        assert isinstance(sid, str), sid
+        assert CC.is_sid(sid), sid
         assert isinstance(pncore, PNCore), pncore
         
         self.__dict__[sid]=pncore
 
+    def map_sids(self, f):
+        """
+        Ret a copy whose sids are f(sid), e.g., ids -> sids (CC.SidTable)
+        """
+        cores_d = Cores_d()
+        for sid, pncore in self.iteritems():
+            cores_d[f(sid)] = pncore
+        return cores_d
+
     def __str__(self):
         return '\n'.join("{}. {}: {}"
                          .format(i+1,sid,self[sid])
@@ -775,12 +1008,14 @@ class Cores_d(CC.CustDict):
             
         return mcores_d
 
-    def analyze(self, dom, z3db, covs_d):
+    def analyze(self, dom, z3db, covs_d, cmatrix=None):
         """
         Simplify cores. If covs_d then also check that cores are valid invs
+        (using cmatrix if given, which then keeps the configs of covs_d)
         """
         assert isinstance(dom, Dom), dom
         assert isinstance(z3db, CC.Z3DB)
+        assert cmatrix is None or isinstance(cmatrix, ConfigsMatrix), cmatrix
         if __debug__:
             if covs_d is not None:
                 assert isinstance(covs_d, CC.Covs_d) and covs_d, covs_d
@@ -798,12 +1033,14 @@ class Cores_d(CC.CustDict):
 
         if covs_d:
             logger.debug("verify ...")
+            if cmatrix is None:
+                cmatrix = ConfigsMatrix(dom)
             cache = {}
             for sid,core in self.iteritems():
-                configs = frozenset(covs_d[sid])
-                key = (core, configs)
+                configs = covs_d[sid]
+                key = (core, cmatrix.bits_of_rows(map(cmatrix.add, configs)))
                 if key not in cache:
-                    core_ = core.verify(configs, dom)
+                    core_ = core.verify(configs, dom, cmatrix)
                     cache[key]=core_
                     show_compare(sid,core,core_)
                 else:
@@ -834,7 +1071,7 @@ class Mcores_d(CC.CustDict):
     """
     def add(self,core, sid):
         assert compat(core, PNCore),core
-        assert isinstance(sid, str),str
+        assert CC.is_sid(sid),sid
         
         super(Mcores_d, self).add_set(core, sid)
 
@@ -861,13 +1098,41 @@ class Mcores_d(CC.CustDict):
             return None #no dup
 
         uniqs = {}
-        for pc in self:
-            expr = pc.z3expr(dom, z3db)
-            dup = find_dup(expr, uniqs)
-            if dup:
-                uniqs[dup].add(pc)
-            else:
-                uniqs[pc] = set()
+        if CC.use_bdd:
+            #equivalent cores have the same canonical form (bdd), 
+            #so only use the solver for cores without one
+            bdddb = z3db.bdddb
+            canons = {}  #canonical form -> uniq core
+            others = []  #uniq cores without canonical forms
+            for pc in self:
+                try:
+                    canon = (pc.bdd(dom, bdddb),)
+                except KeyError:
+                    canon = None
+
+                if canon is not None:
+                    dup = canons.get(canon)
+                    if dup is None and others:
+                        dup = find_dup(pc.z3expr(dom, z3db), others)
+                else:
+                    dup = find_dup(pc.z3expr(dom, z3db), uniqs)
+
+                if dup:
+                    uniqs[dup].add(pc)
+                else:
+                    uniqs[pc] = set()
+                    if canon is not None:
+                        canons[canon] = pc
+                    else:
+                        others.append(pc)
+        else:
+            for pc in self:
+                expr = pc.z3expr(dom, z3db)
+                dup = find_dup(expr, uniqs)
+                if dup:
+                    uniqs[dup].add(pc)
+                else:
+                    uniqs[pc] = set()
 
         if len(uniqs) == len(self):  #no duplicates
             return self
@@ -924,72 +1189,399 @@ class Mcores_d(CC.CustDict):
                          for siz, ncores, ncov in strens)
 
 #Inference algorithm
-class Infer(object):
-    @classmethod
-    def infer(cls, configs, core, dom):
+class ConfigsMatrix(object):
+    """
+    Configs as rows of small int codes.  The j-th column is the j-th 
+    option of dom and has the codebook vals[j], i.e., value vals[j][i] 
+    is coded i and a missing setting (e.g., Otter's partial configs) is
+    coded -1.  A set of values is then a bit mask of codes.
+
+    Uses a numpy array if numpy is available, otherwise array.array's
+    (one per column).
+
+    >>> dom = Dom([('a', frozenset(['0','1'])), \
+    ('b', frozenset(['0','1','2'])), ('c', frozenset(['0','1']))])
+    >>> c1 = Config([('a','0'),('b','1'),('c','0')])
+    >>> c2 = Config([('a','0'),('b','2'),('c','1')])
+    >>> m = ConfigsMatrix(dom)
+    >>> m.add(c1), m.add(c2), m.add(c1), len(m)
+    (0, 1, 0, 2)
+    >>> print m.infer([0, 1], None)
+    a=0 b=1,2
+    >>> print m.infer([1], Core([('b', frozenset(['1'])), ('c', frozenset(['0']))]))
+    b=1,2
+    >>> print m.infer([0, 1], Core([('b', frozenset(['0']))]))
+    true
+    >>> m.c_implies([0, 1], Core([('b', frozenset(['0', '2']))]))
+    [1]
+    >>> m.c_implies([1, 0], Core())
+    [1, 0]
+
+    >>> m.add(Config([('a','1')]))
+    2
+    >>> print m.infer([0, 2], None)
+    true
+    >>> m.c_implies([0, 1, 2], Core([('a', frozenset(['0']))]))
+    [0, 1]
+    """
+    def __init__(self, dom):
+        assert isinstance(dom, Dom), dom
+
+        self.keys = dom.keys()
+        self.cols = dict((k, j) for j, k in enumerate(self.keys))
+        self.vals = [sorted(dom[k]) for k in self.keys]
+        self.codes = [dict((v, i) for i, v in enumerate(vs))
+                      for vs in self.vals]
+        self.fulls = [(1 << len(vs)) - 1 for vs in self.vals]
+
+        self.rows_d = {}  #config -> row
+        self.configs = []  #row -> config
+        self.sid_bits = {}  #sid -> rows (int bitset) of configs covering sid
+        self.sid_class = {}  #sid -> id, same id iff same sid_bits
+        self._nclasses = 0
+        self._masks_d = {}  #(core, neg) -> masks
+        self._bits_d = {}  #(core, is_and, neg) -> rows (int bitset)
+        self._bits_n = 0  #len(self) when _bits_d was computed
+        
+        #int64 masks in numpy
+        self.use_np = np is not None and dom.max_fsiz < 63
+        if self.use_np:
+            self._m = np.empty((16, len(self.keys)), dtype=np.int16)
+        else:
+            self._cols = [array.array('h') for _ in self.keys]
+
+    def __len__(self):
+        return len(self.configs)
+
+    def add(self, config):
         """
-        Approximation in *conjunctive* form
+        Add config (if not yet added) and ret its row
         """
-        assert (all(isinstance(c, Config) for c in configs)
-                and configs), configs
+        try:
+            return self.rows_d[config]
+        except KeyError:
+            pass
+        
+        codes = [self.codes[j][config[k]] if k in config else -1
+                 for j, k in enumerate(self.keys)]
+        row = len(self.configs)
+        if self.use_np:
+            if row == len(self._m):
+                self._m = np.resize(self._m, (2 * row, len(self.keys)))
+            self._m[row] = codes
+        else:
+            for col, code in zip(self._cols, codes):
+                col.append(code)
+                
+        self.rows_d[config] = row
+        self.configs.append(config)
+        return row
+
+    def add_covs(self, configs_d):
+        """
+        Add the configs of configs_d and update the sid index.
+        Ret the rows (int bitset) of the new configs.
+
+        >>> dom = Dom([('a', frozenset(['0','1'])), ('b', frozenset(['0','1']))])
+        >>> c1, c2 = Config([('a','0'),('b','0')]), Config([('a','1'),('b','0')])
+        >>> m = ConfigsMatrix(dom)
+        >>> d = CC.Configs_d(); d[c1] = set(['L1', 'L2'])
+        >>> bin(m.add_covs(d))
+        '0b1'
+        >>> d = CC.Configs_d(); d[c2] = set(['L2'])
+        >>> bin(m.add_covs(d)), bin(m.all_bits)
+        ('0b10', '0b11')
+        >>> bin(m.sid_bits['L1']), bin(m.sid_bits['L2'])
+        ('0b1', '0b11')
+        >>> m.sid_class['L1'] == m.sid_class['L2']
+        False
+        """
+        n = len(self)
+        sids_rows = {}
+        for config, cov in configs_d.iteritems():
+            row = self.add(config)
+            assert row >= n, "{} was added".format(config)
+            for sid in cov:
+                if sid not in sids_rows:
+                    sids_rows[sid] = []
+                sids_rows[sid].append(row - n)
+
+        #sids in the same class are split by their new rows
+        sid_bits, sid_class = self.sid_bits, self.sid_class
+        classes_d = {}
+        for sid, rows in sids_rows.iteritems():
+            bits = self.bits_of_rows(rows)
+            sid_bits[sid] = sid_bits.get(sid, 0) | (bits << n)
+            key = (sid_class.get(sid), bits)
+            if key not in classes_d:
+                classes_d[key] = self._nclasses
+                self._nclasses += 1
+            sid_class[sid] = classes_d[key]
+            
+        return self.all_bits ^ ((1 << n) - 1)
+
+    @property
+    def all_bits(self):
+        return (1 << len(self)) - 1
+
+    @staticmethod
+    def bits_of_rows(rows):
+        """
+        >>> bin(ConfigsMatrix.bits_of_rows([0, 3, 4]))
+        '0b11001'
+        >>> ConfigsMatrix.bits_of_rows([])
+        0
+        """
+        if not rows:
+            return 0
+        bs = bytearray('0') * (max(rows) + 1)
+        for r in rows:
+            bs[r] = '1'
+        return int(str(bs[::-1]), 2)
+
+    @staticmethod
+    def rows_of_bits(bits):
+        """
+        >>> ConfigsMatrix.rows_of_bits(25)
+        [0, 3, 4]
+        >>> ConfigsMatrix.rows_of_bits(0)
+        []
+        """
+        bs = bin(bits)[:1:-1]
+        rows = []
+        i = bs.find('1')
+        while i >= 0:
+            rows.append(i)
+            i = bs.find('1', i + 1)
+        return rows
+    
+    def get_mask(self, j, vs):
+        codes = self.codes[j]
+        return sum(1 << codes[v] for v in vs)
+
+    def masks(self, core, neg=False):
+        """
+        Ret the (column, mask) pairs of core (or of core.neg(dom) if neg)
+
+        >>> dom = Dom([('a', frozenset(['0','1'])), \
+        ('b', frozenset(['0','1','2'])), ('c', frozenset(['0','1']))])
+        >>> m = ConfigsMatrix(dom)
+        >>> core = Core([('b', frozenset(['0','2'])), ('c', frozenset(['0','1']))])
+        >>> m.masks(core)
+        ((1, 5), (2, 3))
+        >>> m.masks(core, neg=True)
+        ((1, 2),)
+        >>> assert m.core_of_masks(m.masks(core, neg=True)) == core.neg(dom)
+        """
+        key = (core, neg)
+        try:
+            return self._masks_d[key]
+        except KeyError:
+            jms = sorted((self.cols[k], self.get_mask(self.cols[k], vs))
+                         for k, vs in core.iteritems())
+            if neg:
+                jms = [(j, self.fulls[j] & ~m) for j, m in jms]
+            jms = tuple((j, m) for j, m in jms if m)
+            self._masks_d[key] = jms
+            return jms
+
+    def core_of_masks(self, jms):
+        return Core((self.keys[j],
+                     frozenset(v for i, v in enumerate(self.vals[j])
+                               if m >> i & 1))
+                    for j, m in jms)
+    
+    def infer(self, rows, core):
+        """
+        Approximation in *conjunctive* form: core (the settings of all
+        options if core is None) extended with the values of the configs
+        of rows, dropping the options that get all their values or that
+        some of these configs do not have
+        """
+        assert rows, rows
         assert Core.maybe_core(core), core
-        assert isinstance(dom, Dom), dom
+
+        if core is None:
+            jms = [(j, 0) for j in range(len(self.keys))]
+        else:
+            jms = [(self.cols[k], self.get_mask(self.cols[k], vs))
+                   for k, vs in core.iteritems()]
+        if not jms:
+            return Core()
         
-        if core is None:  #not yet set
-            core = min(configs, key=lambda c: len(c))
-            core = Core((k, frozenset([v])) for k,v in core.iteritems())
+        if self.use_np:
+            #most options are dropped after a few rows, so use small blocks first
+            rows = np.asarray(rows)
+            js = np.array([j for j, _ in jms])
+            ms = np.array([m for _, m in jms], dtype=np.int64)
+            fulls = np.array([self.fulls[j] for j in js], dtype=np.int64)
+            i, n = 0, 64
+            while i < len(rows) and len(js):
+                sub = self._m[rows[i:i + n]][:, js]
+                ms |= np.bitwise_or.reduce(
+                    np.left_shift(1, np.maximum(sub, 0).astype(np.int64)),
+                    axis=0)
+                keep = (ms != fulls) & (sub >= 0).all(axis=0)
+                js, ms, fulls = js[keep], ms[keep], fulls[keep]
+                i, n = i + n, 4 * n
+            jms = zip(js.tolist(), ms.tolist())
+        else:
+            jms_ = []
+            for j, m in jms:
+                col, full = self._cols[j], self.fulls[j]
+                for r in rows:
+                    code = col[r]
+                    if code < 0:
+                        break
+                    m |= 1 << code
+                    if m == full:
+                        break
+                else:
+                    jms_.append((j, m))
+            jms = jms_
 
-        def f(k,s,ldx):
-            s_ = set(s)
-            for config in configs:
-                if k in config:
-                    s_.add(config[k])
-                    if len(s_) == ldx:
-                        return None
+        return self.core_of_masks((j, m) for j, m in jms
+                                  if m != self.fulls[j])
+        
+    def c_implies(self, rows, core):
+        """
+        Ret rows whose configs imply (conj) core, see Config.c_implies
+        """
+        assert isinstance(core, Core), core
+        if not core or not rows:
+            return list(rows)
+
+        oks = self._implies(rows, self.masks(core), is_and=True)
+        return [r for r, ok in zip(rows, oks) if ok]
+
+    def d_implies(self, rows, core):
+        """
+        Ret rows whose configs imply (disj) core, see Config.d_implies
+
+        >>> dom = Dom([('a', frozenset(['0','1'])), ('b', frozenset(['0','1','2']))])
+        >>> m = ConfigsMatrix(dom)
+        >>> rows = [m.add(Config([('a','0'),('b','1')])), \
+        m.add(Config([('a','1'),('b','2')])), m.add(Config([('b','0')]))]
+        >>> m.d_implies(rows, Core([('a', frozenset(['0'])), ('b', frozenset(['2']))]))
+        [0, 1]
+        >>> m.d_implies(rows, Core([('a', frozenset(['1']))]))
+        [1]
+        >>> m.d_implies(rows, Core())
+        [0, 1, 2]
+        """
+        assert isinstance(core, Core), core
+        if not core or not rows:
+            return list(rows)
+
+        oks = self._implies(rows, self.masks(core), is_and=False)
+        return [r for r, ok in zip(rows, oks) if ok]
+
+    def implies_bits(self, core, is_and, neg=False):
+        """
+        Ret the rows (int bitset) of c_implies (is_and) or d_implies
+        over all configs, i.e., for all rows at once.
+        If neg then use core.neg(dom) instead of core.
+
+        >>> dom = Dom([('a', frozenset(['0','1'])), ('b', frozenset(['0','1','2']))])
+        >>> m = ConfigsMatrix(dom)
+        >>> _ = m.add(Config([('a','0'),('b','1')])), m.add(Config([('a','1'),('b','2')]))
+        >>> core = Core([('a', frozenset(['0'])), ('b', frozenset(['1','2']))])
+        >>> bin(m.implies_bits(core, is_and=True))
+        '0b1'
+        >>> bin(m.implies_bits(core, is_and=False))
+        '0b11'
+        >>> bin(m.implies_bits(core, is_and=False, neg=True))
+        '0b10'
+        """
+        assert isinstance(core, Core), core
+
+        if self._bits_n != len(self):  #new rows
+            self._bits_d = {}
+            self._bits_n = len(self)
+
+        key = (core, is_and, neg)
+        try:
+            return self._bits_d[key]
+        except KeyError:
+            jms = self.masks(core, neg)
+            if jms and len(self):
+                oks = self._implies(None, jms, is_and)
+                if self.use_np:
+                    bits = self.bits_of_rows(np.flatnonzero(oks).tolist())
                 else:
-                    return None
-            return s_
+                    bits = self.bits_of_rows(
+                        [r for r, ok in enumerate(oks) if ok])
+            else:
+                bits = self.all_bits
+            self._bits_d[key] = bits
+            return bits
 
-        vss = [f(k,vs,len(dom[k])) for k,vs in core.iteritems()]
-        core = Core((k,frozenset(vs)) for k,vs in zip(core,vss) if vs)
-        return core  
+    def _implies(self, rows, jms, is_and):
+        """
+        Ret, for each row (all rows if rows is None), if its config
+        has all (is_and) or some of the settings given by masks jms
+        """
+        assert jms, jms
+
+        if self.use_np:
+            js = [j for j, _ in jms]
+            if rows is None:
+                sub = self._m[:len(self), js]
+            else:
+                sub = self._m[np.asarray(rows)][:, js]
+            ms = np.array([m for _, m in jms], dtype=np.int64)
+            ok = (np.left_shift(1, np.maximum(sub, 0).astype(np.int64))
+                  & ms) != 0
+            ok &= sub >= 0
+            return ok.all(axis=1) if is_and else ok.any(axis=1)
+        else:
+            if rows is None:
+                rows = xrange(len(self))
+            cms = [(self._cols[j], m) for j, m in jms]
+            f = all if is_and else any
+            return [f(col[r] >= 0 and m >> col[r] & 1 for col, m in cms)
+                    for r in rows]
 
+        
+class Infer(object):
     @classmethod
-    def infer_cache(cls, core, configs, dom, cache):
+    def infer_cache(cls, core, bits, cmatrix, cache):
+        """
+        bits: rows (int bitset) of the configs in cmatrix
+        """
         assert core is None or isinstance(core, Core), core
-        assert (configs and
-                all(isinstance(c,Config) for c in configs)), configs
-        assert isinstance(dom,Dom),dom
+        assert bits > 0, bits
+        assert isinstance(cmatrix, ConfigsMatrix), cmatrix
         assert isinstance(cache,dict),cache
 
-        configs = frozenset(configs)
-        key = (core,configs)
+        key = (core,bits)
         if key not in cache:
-            cache[key] = cls.infer(configs,core,dom)
+            cache[key] = cmatrix.infer(cmatrix.rows_of_bits(bits),core)
         return cache[key]
 
     @classmethod
-    def infer_sid(cls,sid,core,cconfigs_d,configs_d,covs_d,dom,cache):
-        assert isinstance(sid,str),sid
+    def infer_sid(cls,sid,core,cmatrix,new_bits,cache):
+        """
+        new_bits: rows (int bitset) of the new configs in cmatrix
+        """
+        assert CC.is_sid(sid),sid
         assert isinstance(core, PNCore),core
-        assert (cconfigs_d and
-                isinstance(cconfigs_d, CC.Configs_d)), cconfigs_d
-        assert isinstance(configs_d, CC.Configs_d), configs_d
-        assert isinstance(covs_d, CC.Covs_d),covs_d
-        assert isinstance(dom,Dom),dom        
+        assert isinstance(cmatrix, ConfigsMatrix), cmatrix
+        assert new_bits > 0, new_bits
         assert isinstance(cache,dict),cache
-        
-        def _f(configs, cc, cd, _b):
+
+        def _f(bits, cc, cd, _b):
             new_cc,new_cd = cc,cd
-            if configs:
-                new_cc = cls.infer_cache(cc,configs,dom,cache)
+            if bits:
+                new_cc = cls.infer_cache(cc,bits,cmatrix,cache)
 
             #TODO: this might be a bug, if new_cc is empty,
             #then new_cd won't be updated
             if new_cc:
-                configs_ = [c for c in _b() if c.c_implies(new_cc)]
-                if configs_:
-                    new_cd = cls.infer_cache(cd,configs_,dom,cache)
+                rows_ = cmatrix.c_implies(cmatrix.rows_of_bits(_b()), new_cc)
+                if rows_:
+                    new_cd = cls.infer_cache(
+                        cd,cmatrix.bits_of_rows(rows_),cmatrix,cache)
                     if new_cd:
                         new_cd = Core((k,v) for (k,v) in new_cd.iteritems()
                                       if k not in new_cc)
@@ -997,25 +1589,28 @@ class Infer(object):
             return new_cc, new_cd
 
         pc, pd, nc, nd = core
+        all_bits = cmatrix.all_bits
+        sid_bits = cmatrix.sid_bits.get(sid, 0)
         
-        pconfigs = [c for c in cconfigs_d if sid in cconfigs_d[c]]
- 
+        pbits = new_bits & sid_bits
         if nc is None:
             #never done nc, so has to consider all traces
-            nconfigs = [c for c in configs_d if sid not in configs_d[c]]
+            nbits = all_bits & ~sid_bits
         else:
             #done nc, so can do incremental traces
-            nconfigs = [c for c in cconfigs_d if sid not in cconfigs_d[c]]
+            nbits = new_bits & ~sid_bits
             
-        _b = lambda: [c for c in configs_d if sid not in configs_d[c]]
-        pc_,pd_ = _f(pconfigs, pc, pd, _b)
-        
-        _b = lambda: covs_d[sid]
-        nc_,nd_ = _f(nconfigs, nc, nd, _b)
+        pc_,pd_ = _f(pbits, pc, pd, lambda: all_bits & ~sid_bits)
+        nc_,nd_ = _f(nbits, nc, nd, lambda: sid_bits)
         return PNCore((pc_, pd_, nc_, nd_))
 
     @classmethod
-    def infer_covs(cls, cores_d, cconfigs_d, configs_d, covs_d, dom, sids=None):
+    def infer_covs(cls, cores_d, cconfigs_d, configs_d, covs_d, dom, sids=None,
+                   cmatrix=None, jobs=1):
+        """
+        cmatrix (if given) keeps the configs of configs_d between calls.
+        jobs > 1: infer sids in parallel, sharded by sid classes.
+        """
         assert isinstance(cores_d, Cores_d), cores_d
         assert isinstance(cconfigs_d, CC.Configs_d) and cconfigs_d, cconfigs_d
         assert isinstance(configs_d, CC.Configs_d), configs_d        
@@ -1023,7 +1618,15 @@ class Infer(object):
         assert isinstance(covs_d, CC.Covs_d), covs_d
         assert isinstance(dom, Dom), dom
         assert not sids or CC.is_cov(sids), sids
-            
+        assert cmatrix is None or isinstance(cmatrix, ConfigsMatrix), cmatrix
+        assert isinstance(jobs, int) and jobs >= 1, jobs
+
+        if cmatrix is None:
+            cmatrix = ConfigsMatrix(dom)
+            if configs_d:
+                cmatrix.add_covs(configs_d)
+        assert len(cmatrix) == len(configs_d), (len(cmatrix), len(configs_d))
+        
         sids_ = set(cores_d.keys())
         #update configs_d and covs_d
         for config in cconfigs_d:
@@ -1033,13 +1636,16 @@ class Infer(object):
                 
             assert config not in configs_d, config
             configs_d[config] = cconfigs_d[config]
+        new_bits = cmatrix.add_covs(cconfigs_d)
 
         #only consider interested sids
         if sids:
             sids_ = [sid for sid in sids_ if sid in sids]
             
-        cache = {}
-        new_covs, new_cores = set(), set()  #updated stuff
+        new_covs = set()
+        #sids covered by the same configs and having the same cores
+        #get the same results, so only infer one sid of each class
+        classes_d = {}
         for sid in sorted(sids_):
             if sid in cores_d:
                 core = cores_d[sid]
@@ -1047,23 +1653,55 @@ class Infer(object):
                 core = PNCore.mk_default()
                 new_covs.add(sid) #progress
 
-            core_ = cls.infer_sid(
-                sid, core, cconfigs_d, configs_d, covs_d, dom, cache)
-                
+            key = (cmatrix.sid_class[sid], core)
+            if key not in classes_d:
+                classes_d[key] = [] 
+            classes_d[key].append(sid)
+            
+        classes = sorted(classes_d.iteritems(),
+                         key=lambda (_, csids): csids[0])
+        tasks = [(csids[0], core) for (_, core), csids in classes]
+        
+        def _f(tasks):
+            cache = {}
+            return [cls.infer_sid(sid, core, cmatrix, new_bits, cache)
+                    for sid, core in tasks]
+
+        if jobs > 1 and len(tasks) > jobs:
+            #workers are forked with (copy-on-write) cmatrix, 
+            #and only sids and cores are shipped.
+            #Use more shards than jobs to balance the load
+            nshards = min(4 * jobs, len(tasks))
+            shards = [tasks[i::nshards] for i in range(nshards)]
+            logger.detail("infer {} sid classes using {} jobs"
+                          .format(len(tasks), jobs))
+            cores = [None] * len(tasks)
+            for i, cores_ in enumerate(CM.pmap(_f, shards, jobs)):
+                cores[i::nshards] = cores_
+        else:
+            cores = _f(tasks)
+
+        new_cores = set()  #updated stuff
+        for ((_, core), csids), core_ in zip(classes, cores):
             if not core_ == core: #progress
-                new_cores.add(sid)
-                cores_d[sid] = core_
+                new_cores.update(csids)
+                for sid in csids:
+                    cores_d[sid] = core_
 
+        logger.detail("infer {} sids in {} classes"
+                      .format(len(sids_), len(classes_d)))
         return new_covs, new_cores
 
 class DTrace(object):
     """
     Object for saving information (for later analysis)
     """
+    costs = None  #of DTraces saved before costs were kept
+    
     def __init__(self,citer,itime,xtime,
                  nconfigs,ncovs,ncores,
                  cconfigs_d,new_covs,new_cores,
-                 sel_core,cores_d):
+                 sel_core,cores_d,costs=None):
 
         self.citer = citer
         self.itime = itime
@@ -1076,10 +1714,21 @@ class DTrace(object):
         self.new_cores = new_cores
         self.sel_core = sel_core
         self.cores_d = cores_d
+        #config -> (secs, outcome) of the evaluated configs, see Config.eval
+        self.costs = costs
         
-    def show(self, dom, z3db):
+    def show(self, dom, z3db, sid_table=None):
+        """
+        sid_table: show the sids of the ids of a run (see IGen.go)
+        """
         assert isinstance(dom, Dom)
         assert isinstance(z3db, CC.Z3DB)
+        assert sid_table is None or isinstance(sid_table, CC.SidTable)
+
+        cconfigs_d, cores_d = self.cconfigs_d, self.cores_d
+        if sid_table is not None:
+            cconfigs_d = cconfigs_d.map_covs(sid_table.get_sids)
+            cores_d = cores_d.map_sids(sid_table.__getitem__)
         
         logger.debug("ITER {}, ".format(self.citer) +
                     "{}s, ".format(self.itime) +
@@ -1095,15 +1744,26 @@ class DTrace(object):
         logger.debug('select core: ({}) {}'.format(self.sel_core.sstren,
                                                    self.sel_core))
         logger.debug('create {} configs'.format(len(self.cconfigs_d)))
-        logger.detail("\n"+str(self.cconfigs_d))
-        mcores_d = self.cores_d.merge(dom, z3db)
+        logger.detail("\n"+str(cconfigs_d))
+        if self.costs:
+            ntimeouts = sum(o == 'timeout' for _, o in self.costs.itervalues())
+            log_f = logger.debug if ntimeouts else logger.detail
+            log_f("eval {} configs: max {}s, {} timeouts".format(
+                len(self.costs), max(t for t, _ in self.costs.itervalues()),
+                ntimeouts))
+        mcores_d = cores_d.merge(dom, z3db)
         logger.debug("infer {} interactions".format(len(mcores_d)))
         logger.detail('\n{}'.format(mcores_d))
         logger.debug("strens: {}".format(mcores_d.strens_str))
 
     @staticmethod
-    def save_pre(seed,dom,tmpdir):
-        CM.vsave(os.path.join(tmpdir,'pre'),(seed,dom))
+    def save_pre(seed,dom,tmpdir,sid_table=None):
+        #(re)saved with the sid table of the run as it grows, see IGen.go
+        #(write then rename so that a kill leaves the previous pre)
+        f = os.path.join(tmpdir,'pre')
+        pre = (seed,dom) if sid_table is None else (seed,dom,sid_table)
+        CM.vsave(f + '.tmp', pre)
+        os.rename(f + '.tmp', f)
 
     @staticmethod
     def save_post(pp_cores_d,itime_total,tmpdir):
@@ -1113,35 +1773,66 @@ class DTrace(object):
     def save_iter(cur_iter,dtrace,tmpdir):
         CM.vsave(os.path.join(tmpdir,'{}.tvn'.format(cur_iter)),dtrace)
 
+    @staticmethod
+    def save_state(state, tmpdir):
+        #state to resume after the last complete iter, see IGen.go
+        #(write then rename so that a kill leaves the previous state)
+        f = os.path.join(tmpdir, 'state')
+        CM.vsave(f + '.tmp', state)
+        os.rename(f + '.tmp', f)
+
+    @staticmethod
+    def load_state(dir_):
+        return CM.vload(os.path.join(dir_, 'state'))
+
     @staticmethod
     def load_pre(dir_):
-        seed,dom = CM.vload(os.path.join(dir_,'pre'))
+        seed,dom = CM.vload(os.path.join(dir_,'pre'))[:2]
         return seed,dom
 
+    @staticmethod
+    def load_sid_table(dir_):
+        #None if the covs of the run were saved as sids
+        pre = CM.vload(os.path.join(dir_,'pre'))
+        return pre[2] if len(pre) > 2 else None
+
     @staticmethod
     def load_post(dir_):
         pp_cores_d,itime_total = CM.vload(os.path.join(dir_,'post'))
         return pp_cores_d,itime_total
 
     @staticmethod
-    def load_iter(dir_,f):
+    def load_iter(dir_,f,sid_table=None):
+        """
+        sid_table: map the ids of the loaded iter back to sids
+        """
         dtrace = CM.vload(os.path.join(dir_,f))
+        if sid_table is not None:
+            get_sid = sid_table.__getitem__
+            dtrace.cconfigs_d = dtrace.cconfigs_d.map_covs(sid_table.get_sids)
+            dtrace.cores_d = dtrace.cores_d.map_sids(get_sid)
+            dtrace.new_covs = sid_table.get_sids(dtrace.new_covs)
+            dtrace.new_cores = sid_table.get_sids(dtrace.new_cores)
         return dtrace
 
     @staticmethod
-    def str_of_summary(seed,iters,itime,xtime,nconfigs,ncovs,tmpdir):
+    def str_of_summary(seed,iters,itime,xtime,nconfigs,ncovs,tmpdir,
+                       cache_stat=None):
         ss = ["Seed {}".format(seed),
               "Iters {}".format(iters),
               "Time ({}s, {}s)".format(itime,xtime),
               "Configs {}".format(nconfigs),
-              "Covs {}".format(ncovs),
-              "Tmpdir {}".format(tmpdir)]
+              "Covs {}".format(ncovs)]
+        if cache_stat:
+            ss.append("Cache ({} hits, {} misses)".format(*cache_stat))
+        ss.append("Tmpdir {}".format(tmpdir))
         return "Summary: " + ', '.join(ss)    
 
     @classmethod
     def load_dir(cls, dir_):        
         seed,dom = cls.load_pre(dir_)
-        dts = [cls.load_iter(dir_,f)
+        sid_table = cls.load_sid_table(dir_)
+        dts = [cls.load_iter(dir_,f,sid_table)
                for f in os.listdir(dir_) if f.endswith('.tvn')]
         try:
             pp_cores_d,itime_total = cls.load_post(dir_)
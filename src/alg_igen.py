@@ -1,48 +1,210 @@
 from time import time
 import os.path
 import random
+import heapq
 
 import vu_common as CM
 import config_common as CC
 
-from alg import (DTrace, Infer,
-                 Dom, Config, Core, MCore, SCore, PNCore,
+from alg import (DTrace, Infer, ConfigsMatrix,
+                 Dom, Config, Core, MCore, SCore,
                  Cores_d, Mcores_d)
 
 logger = CM.VLog('alg_main')
 logger.level = CC.logger_level
 CM.VLog.PRINT_TIME = True
 
+class SCoreQueue(object):
+    """
+    Max heap of the SCores that can be selected from the (distinct)
+    pncores of cores_d, by (sstren, vstren).  It is updated with the
+    sids whose cores changed, and entries of removed pncores and of 
+    ignored (i.e., selected) SCores are dropped when they reach the top.
+
+    >>> from alg import PNCore
+    >>> c = lambda k, v: Core([(k, frozenset([v]))])
+    >>> pc1 = PNCore((c('a', '1'), None, None, None))
+    >>> pc2 = PNCore((c('a', '1'), None, c('b', '0'), c('c', '0')))
+    >>> q = SCoreQueue(set())
+    >>> q.update({'L1': pc1, 'L2': pc2}, ['L1', 'L2'])
+    >>> print q.pop(1)
+    mc(keep): a=1
+    >>> print q.pop(1)
+    mc: b=0
+    >>> q.update({'L1': pc1, 'L2': pc1}, ['L2'])
+    >>> print q.pop(1)
+    None
+    >>> print len(q.ignore_sel_cores)
+    2
+    """
+    def __init__(self, ignore_sel_cores):
+        assert (isinstance(ignore_sel_cores, set) and 
+                all(isinstance(c, SCore) for c in ignore_sel_cores)),\
+                ignore_sel_cores
+
+        self.ignore_sel_cores = ignore_sel_cores
+        self.heap = []
+        self.sid_cores = {}  #sid -> pncore
+        self.npncores = {}  #pncore -> nsids
+        self.owners = {}  #sel_core -> pncores
+        self.nentries = 0
+
+    def __len__(self): return len(self.heap)
+
+    def update(self, cores_d, sids):
+        for sid in sids:
+            pncore = cores_d[sid]
+            old = self.sid_cores.get(sid)
+            if old == pncore:
+                continue
+            if old is not None:
+                self.npncores[old] -= 1
+                if not self.npncores[old]:
+                    del self.npncores[old]
+
+            self.sid_cores[sid] = pncore
+            if pncore in self.npncores:
+                self.npncores[pncore] += 1
+            else:
+                self.npncores[pncore] = 1
+                self.push(pncore)
+
+    def push(self, pncore):
+        for sel_core in self.get_sel_cores(pncore, self.ignore_sel_cores):
+            self.nentries += 1
+            heapq.heappush(self.heap, (-sel_core.sstren, -sel_core.vstren,
+                                       self.nentries, sel_core, pncore))
+            if sel_core in self.owners:
+                self.owners[sel_core].add(pncore)
+            else:
+                self.owners[sel_core] = set([pncore])
+
+    def pop(self, min_stren, pncores=None):
+        """
+        Ret (and ignore from now) the best SCore having sstren >= min_stren
+        or None if there is none.
+        pncores (if given): skip the SCores of these pncores
+        and add the pncore of the ret SCore to it.
+        """
+        skips = []
+        sel_core = None
+        while self.heap:
+            sstren, _, _, sel_core_, pncore = self.heap[0]
+            if (pncore not in self.npncores or
+                sel_core_ in self.ignore_sel_cores):
+                heapq.heappop(self.heap)
+            elif -sstren < min_stren:
+                break
+            elif pncores and pncore in pncores:
+                skips.append(heapq.heappop(self.heap))
+            else:
+                heapq.heappop(self.heap)
+                sel_core = sel_core_
+                break
+
+        for entry in skips:
+            heapq.heappush(self.heap, entry)
+            
+        if sel_core is None:
+            return None
+
+        self.ignore_sel_cores.add(sel_core)
+        if pncores is not None:
+            pncores.add(pncore)
+        #pncores having sel_core might have other SCores now
+        for pncore in self.owners.pop(sel_core):
+            if pncore in self.npncores:
+                self.push(pncore)
+        return sel_core
+
+    @staticmethod
+    def get_sel_cores(pncore, ignore_sel_cores):
+        """
+        Ret the SCores of pncore that can be selected
+        """
+        (pc,pd,nc,nd) = pncore
+        sel_cores = []
+        #if can add pc then don't cosider pd (i.e., refine pc first)
+        if pc and (pc,None) not in ignore_sel_cores:
+            sc = SCore((pc, None))
+            if pd is None: sc.set_keep()
+            sel_cores.append(sc)
+
+        elif pd and (pd,pc) not in ignore_sel_cores:
+            sc = SCore((pd,pc))
+            sel_cores.append(sc)
+
+        if nc and (nc, None) not in ignore_sel_cores:
+            sc = SCore((nc,None))
+            if nd is None: sc.set_keep()
+            sel_cores.append(sc)
+
+        elif nd and (nd,nc) not in ignore_sel_cores:
+            sc = SCore((nd,nc))
+            sel_cores.append(sc)
+
+        return sel_cores
+
 class IGen(object):
     """
     Main algorithm
     """
-    def __init__(self, dom, get_cov, sids=None):
+    def __init__(self, dom, get_cov, sids=None, jobs=1, cov_cache=None,
+                 batch=1):
+        """
+        batch: select (up to) this many cores per iter and eval 
+        their cex configs together
+        """
         assert isinstance(dom, Dom), dom
         assert callable(get_cov), get_cov
         assert not sids or CC.is_cov(sids), sids
+        assert isinstance(jobs, int) and jobs >= 1, jobs
+        assert cov_cache is None or isinstance(cov_cache, CC.CovCache)
+        assert isinstance(batch, int) and batch >= 1, batch
             
         self.dom = dom
         self.get_cov = get_cov
         self.sids = sids
+        self.jobs = jobs
+        self.batch = batch
+        self.cov_cache = cov_cache
         self.z3db = CC.Z3DB(self.dom)        
+        self.sid_table = None  #of the current run, see go
+        self.eval_pool = None  #workers to eval configs during a run
         
-    def go(self, seed, rand_n=None, econfigs=None, tmpdir=None):
+    def go(self, seed, rand_n=None, econfigs=None, tmpdir=None,
+           resume=False):
         """
         rand_n = None: use default CEGIR mode
         rand_n = 0  : use init configs
         rand_n > 0  : use rand_n configs
         rand_n < 0  : use all possible configs
+
+        resume: continue the (CEGIR) run saved in tmpdir after its last
+        complete iter, without re-evaluating its configs
+
+        During the run, covs are sets of the ids of self.sid_table
+        (saved in pre), and the results are ret with sids.
         """
         assert isinstance(seed,(float, int)), seed
         assert rand_n is None or isinstance(rand_n, int), rand_n
         assert not econfigs or isinstance(econfigs, list), econfigs
         assert isinstance(tmpdir, str) and os.path.isdir(tmpdir), tmpdir
+        assert not resume or rand_n is None, rand_n
             
         random.seed(seed)
         logger.debug("seed: {}, tmpdir: {}".format(seed, tmpdir))
 
-        DTrace.save_pre(seed, self.dom, tmpdir)
+        if resume:
+            self.sid_table = DTrace.load_sid_table(tmpdir)
+            assert self.sid_table is not None, \
+                "'{}' has no sid table to resume".format(tmpdir)
+        else:
+            self.sid_table = CC.SidTable()
+            DTrace.save_pre(seed, self.dom, tmpdir, self.sid_table)
+        nsids = len(self.sid_table)
+        #sids of interest as ids
+        sids = self.sid_table.get_ids(self.sids) if self.sids else None
 
         #some settings
         cur_iter = 1
@@ -51,67 +213,95 @@ class IGen(object):
         cur_stuck = 0
         max_stuck = 3
         cores_d, configs_d, covs_d = Cores_d(), CC.Configs_d(), CC.Covs_d()
+        cmatrix = ConfigsMatrix(self.dom)
         sel_core = SCore.mk_default()
         ignore_sel_cores = set()
 
+        if self.cov_cache:
+            cache_stat = self.cov_cache.stat
+            
         #begin
         st = time()
         ct = st
         xtime_total = 0.0
 
-        cconfigs_d = CC.Configs_d()
-        configs = []
-        xtime = 0.0
-
-        #init configs
-        if econfigs:
-            for c, cov in econfigs:
-                c = Config(c)
-                if cov is None:
-                    configs.append(c)
-                else:
-                    cconfigs_d[c] = cov
-                    
-        configs = [c for c in configs if c not in cconfigs_d]
-
-        logger.debug("existing configs {} evaled, {} not evaled"
-                     .format(len(cconfigs_d), len(configs)))
-
-        if not cconfigs_d:
-            configs_ = self.gen_configs_init(rand_n, seed)
-            configs.extend(configs_)
-
-        if configs:
-            cconfigs_d_, xtime = self.eval_configs(configs)
-            xtime_total += xtime
-            for c in cconfigs_d_:
-                assert c not in cconfigs_d
-                cconfigs_d[c]  = cconfigs_d_[c]
-                
-        logger.debug("init configs {}".format(len(cconfigs_d)))
-        
-        new_covs, new_cores = Infer.infer_covs(
-            cores_d, cconfigs_d, configs_d, covs_d, self.dom, self.sids)
+        if resume:
+            (cur_iter, cur_min_stren, cur_stuck, ignore_sel_cores,
+             xtime_total, rtime, rstate) = DTrace.load_state(tmpdir)
+            cores_d = self.load_iters(tmpdir, cur_iter,
+                                      configs_d, covs_d, cmatrix)
+            random.setstate(rstate)
+            st -= rtime
+            new_cores = set(cores_d)  #to queue all cores
+            logger.debug("resume after iter {}: {} configs, {} covs"
+                         .format(cur_iter, len(configs_d), len(covs_d)))
+        else:
+            cconfigs_d = CC.Configs_d()
+            configs = []
+            xtime = 0.0
+            costs = {}
+
+            #init configs
+            if econfigs:
+                for c, cov in econfigs:
+                    c = Config(c)
+                    if cov is None:
+                        configs.append(c)
+                    else:
+                        cconfigs_d[c] = self.sid_table.get_ids(cov)
+
+            configs = [c for c in configs if c not in cconfigs_d]
+
+            logger.debug("existing configs {} evaled, {} not evaled"
+                         .format(len(cconfigs_d), len(configs)))
+
+            if not cconfigs_d:
+                configs_ = self.gen_configs_init(rand_n, seed)
+                configs.extend(configs_)
+
+            if configs:
+                cconfigs_d_, costs, xtime = self.eval_configs(configs)
+                xtime_total += xtime
+                for c in cconfigs_d_:
+                    assert c not in cconfigs_d
+                    cconfigs_d[c]  = cconfigs_d_[c]
+
+            logger.debug("init configs {}".format(len(cconfigs_d)))
+
+            new_covs, new_cores = Infer.infer_covs(
+                cores_d, cconfigs_d, configs_d, covs_d, self.dom, sids,
+                cmatrix, self.jobs)
             
+        sel_cores = SCoreQueue(ignore_sel_cores)
         while True:
-            ct_ = time(); itime = ct_ - ct; ct = ct_
-            dtrace = DTrace(
-                cur_iter, itime, xtime,
-                len(configs_d), len(covs_d), len(cores_d),
-                cconfigs_d,
-                new_covs, new_cores,
-                sel_core,
-                cores_d)
-            dtrace.show(self.dom, self.z3db)
-            DTrace.save_iter(cur_iter, dtrace, tmpdir)
-
-            if rand_n is not None:
-                break
+            if resume:  #cur_iter was saved
+                resume = False
+            else:
+                ct_ = time(); itime = ct_ - ct; ct = ct_
+                dtrace = DTrace(
+                    cur_iter, itime, xtime,
+                    len(configs_d), len(covs_d), len(cores_d),
+                    cconfigs_d,
+                    new_covs, new_cores,
+                    sel_core,
+                    cores_d,
+                    costs)
+                dtrace.show(self.dom, self.z3db, self.sid_table)
+                if len(self.sid_table) > nsids:  #new sids
+                    nsids = len(self.sid_table)
+                    DTrace.save_pre(seed, self.dom, tmpdir, self.sid_table)
+                DTrace.save_iter(cur_iter, dtrace, tmpdir)
+                DTrace.save_state(
+                    (cur_iter, cur_min_stren, cur_stuck, ignore_sel_cores,
+                     xtime_total, time() - st, random.getstate()), tmpdir)
+
+                if rand_n is not None:
+                    break
 
             cur_iter += 1
+            sel_cores.update(cores_d, new_cores)
             sel_core, configs = self.gen_configs_iter(
-                set(cores_d.values()), ignore_sel_cores,
-                cur_min_stren, configs_d)
+                sel_cores, cur_min_stren, configs_d)
 
             if sel_core is None:
                 cur_iter -= 1
@@ -120,10 +310,11 @@ class IGen(object):
 
             assert configs, configs
                 
-            cconfigs_d, xtime = self.eval_configs(configs)
+            cconfigs_d, costs, xtime = self.eval_configs(configs)
             xtime_total += xtime
             new_covs, new_cores = Infer.infer_covs(
-                cores_d, cconfigs_d, configs_d, covs_d, self.dom, self.sids)
+                cores_d, cconfigs_d, configs_d, covs_d, self.dom, sids,
+                cmatrix, self.jobs)
 
             if new_covs or new_cores: #progress
                 cur_stuck = 0
@@ -135,7 +326,17 @@ class IGen(object):
                     cur_min_stren += 1
                     logger.detail('cur_min_stren is {}'.format(cur_min_stren))
 
+        if self.eval_pool:
+            self.eval_pool.close()
+            self.eval_pool = None
+
         #postprocess
+        #ids -> sids
+        get_sid = self.sid_table.__getitem__
+        cores_d = cores_d.map_sids(get_sid)
+        configs_d = configs_d.map_covs(self.sid_table.get_sids)
+        covs_d = covs_d.map_sids(get_sid)
+
         #only analyze sids
         if self.sids:
             cores_d_, covs_d_ = Cores_d(), CC.Covs_d()
@@ -144,16 +345,21 @@ class IGen(object):
                     cores_d_[sid] = cores_d[sid]
                     for c in covs_d[sid]:
                         covs_d_.add(sid, c)
-            pp_cores_d = cores_d_.analyze(self.dom, self.z3db, covs_d_)
+            pp_cores_d = cores_d_.analyze(self.dom, self.z3db, covs_d_, cmatrix)
             _ = pp_cores_d.merge(self.dom, self.z3db, show_detail=True)
         else:
-            pp_cores_d = cores_d.analyze(self.dom, self.z3db, covs_d)
+            pp_cores_d = cores_d.analyze(self.dom, self.z3db, covs_d, cmatrix)
             _ = pp_cores_d.merge(self.dom, self.z3db, show_detail=True)
         
         itime_total = time() - st
+        if self.cov_cache:  #stat of this run
+            cache_stat = tuple(n - n_ for n, n_ in
+                               zip(self.cov_cache.stat, cache_stat))
+        else:
+            cache_stat = None
         logger.debug(DTrace.str_of_summary(
             seed, cur_iter, itime_total, xtime_total,
-            len(configs_d), len(covs_d), tmpdir))
+            len(configs_d), len(covs_d), tmpdir, cache_stat))
         logger.debug("Done (seed {}, test {})"
                     .format(seed, random.randrange(100)))
         DTrace.save_post(pp_cores_d, itime_total, tmpdir)
@@ -168,16 +374,50 @@ class IGen(object):
         return self.go(seed=seed, rand_n=rand_n, econfigs=econfigs, tmpdir=tmpdir)
 
     #Helper functions
+    def load_iters(self, tmpdir, cur_iter, configs_d, covs_d, cmatrix):
+        """
+        Add the configs of iters 1 .. cur_iter saved in tmpdir 
+        (in the order they were evaluated) and ret the cores of cur_iter
+        """
+        seed, dom = DTrace.load_pre(tmpdir)
+        assert dom == self.dom, "'{}' has another dom".format(tmpdir)
+
+        for i in range(1, cur_iter + 1):
+            dtrace = DTrace.load_iter(tmpdir, '{}.tvn'.format(i))
+            assert dtrace.citer == i, (dtrace.citer, i)
+            for c, cov in dtrace.cconfigs_d.iteritems():
+                for sid in cov:
+                    covs_d.add(sid, c)
+                configs_d[c] = cov
+            cmatrix.add_covs(dtrace.cconfigs_d)
+                
+        return dtrace.cores_d
+
     def eval_configs(self, configs):
+        """
+        Ret the results (as ids of self.sid_table) and the costs 
+        (see Config.eval) of configs and the eval time
+        """
         assert isinstance(configs, list) and configs, configs
         assert  all(isinstance(c, Config) for c in configs), configs
         
+        #workers (and their run_script servers, -server) are kept 
+        #for the run instead of being forked for each eval
+        if self.jobs > 1 and self.eval_pool is None:
+            get_cov = self.get_cov
+            self.eval_pool = CM.PMap(
+                lambda c: Config.eval_f(get_cov, c), self.jobs)
+        
         st = time()
-        results = Config.eval(configs, self.get_cov, self.dom)
+        costs = {}
+        results = Config.eval(configs, self.get_cov, self.dom,
+                              self.jobs, self.cov_cache, costs,
+                              self.eval_pool)
         cconfigs_d = CC.Configs_d()
+        get_ids = self.sid_table.get_ids
         for c,rs in results:
-            cconfigs_d[c] = rs
-        return cconfigs_d, time() - st
+            cconfigs_d[c] = get_ids(rs)
+        return cconfigs_d, costs, time() - st
 
     def gen_configs_init(self, rand_n, seed):
         #return []
@@ -196,17 +436,16 @@ class IGen(object):
         assert configs, 'no initial configs created'
         return configs
         
-    def gen_configs_iter(self, cores, ignore_sel_cores, min_stren, configs_d):
-        assert (isinstance(cores, set) and 
-                all(isinstance(c, PNCore) for c in cores)), cores
-        assert (isinstance(ignore_sel_cores, set) and 
-                all(isinstance(c, SCore) for c in ignore_sel_cores)),\
-                ignore_sel_cores
+    def gen_configs_iter(self, sel_cores, min_stren, configs_d):
+        assert isinstance(sel_cores, SCoreQueue), sel_cores
         assert isinstance(configs_d, CC.Configs_d),configs_d
 
+        if self.batch > 1:
+            return self.gen_configs_batch(sel_cores, min_stren, configs_d)
+        
         configs = []
         while True:
-            sel_core = self.select_core(cores, ignore_sel_cores, min_stren)
+            sel_core = sel_cores.pop(min_stren)
             if sel_core is None:
                 break
 
@@ -224,47 +463,35 @@ class IGen(object):
 
         return sel_core, configs
 
-    @staticmethod
-    def select_core(pncores, ignore_sel_cores, min_stren):
+    def gen_configs_batch(self, sel_cores, min_stren, configs_d):
         """
-        Returns either None or SCore
+        Like gen_configs_iter but select up to self.batch cores,
+        each from a different pncore, and ret the best one and
+        the cex configs of all of them (distinct, not in configs_d).
         """
-        assert (all(isinstance(c, PNCore) for c in pncores) and
-                pncores), pncores
-        assert (isinstance(ignore_sel_cores, set) and
-                all(isinstance(c, SCore) for c in ignore_sel_cores)),\
-            ignore_sel_cores
-
-        sel_cores = []
-        for (pc,pd,nc,nd) in pncores:
-            #if can add pc then don't cosider pd (i.e., refine pc first)
-            if pc and (pc,None) not in ignore_sel_cores:
-                sc = SCore((pc, None))
-                if pd is None: sc.set_keep()
-                sel_cores.append(sc)
-                    
-            elif pd and (pd,pc) not in ignore_sel_cores:
-                sc = SCore((pd,pc))
-                sel_cores.append(sc)
-
-            if nc and (nc, None) not in ignore_sel_cores:
-                sc = SCore((nc,None))
-                if nd is None: sc.set_keep()
-                sel_cores.append(sc)
-
-            elif nd and (nd,nc) not in ignore_sel_cores:
-                sc = SCore((nd,nc))
-                sel_cores.append(sc)
-                
-        sel_cores = [c for c in sel_cores if c.sstren >= min_stren]
+        sel_cores_, pncores, configs = [], set(), []
+        while len(sel_cores_) < self.batch:
+            sel_core = sel_cores.pop(min_stren, pncores)
+            if sel_core is None:
+                break
 
-        if sel_cores:
-            sel_core = max(sel_cores, key=lambda c: (c.sstren, c.vstren))
-            ignore_sel_cores.add(sel_core)
-        else:
-            sel_core = None
+            n = len(configs)
+            configs = self.dom.gen_configs_cex(
+                sel_core, configs_d, self.z3db, configs)
+            if len(configs) > n:
+                sel_cores_.append(sel_core)
+            else:
+                logger.debug("no cex's created for sel_core {}, "
+                             "try new core".format(sel_core))
 
-        return sel_core
+        assert len(configs) == len(set(configs)), configs
+        assert all(c not in configs_d for c in configs), configs
+        if not sel_cores_:
+            return None, configs
+        
+        logger.detail("select {} cores: {}".format(
+            len(sel_cores_), ', '.join(map(str, sel_cores_))))
+        return sel_cores_[0], configs
 
 
     
@@ -33,7 +33,7 @@ def percentile(l, percent, key=lambda x:x):
     return d0 + d1
 
 median = lambda l: percentile(l, percent=0.5)
-siqr = lambda l: (percentile(l, 75) - percentile(l, 25)) / 2
+siqr = lambda l: (percentile(l, 0.75) - percentile(l, 0.25)) / 2
     
 
 class LoadData(object):
@@ -223,8 +223,10 @@ class Analysis(object):
 
         ld.dts.sort(key=lambda dt: dt.citer)        
         if show_iters:
+            #the loaded iters have sids (mapped by DTrace.load_dir
+            #with the sid table of the run), so no sid_table here
             for dt in ld.dts:
-                dt.show(ld.z3db, ld.dom)
+                dt.show(ld.dom, ld.z3db)
 
         if not hasattr(ld.pp_cores_d.values()[0], 'vstr'):
             logger.warn("Old format, has no vstr .. re-analyze")
@@ -83,12 +83,14 @@ class MinConfigs(XAnalysis):
 
 
     @classmethod
-    def prune(cls, d):
+    def prune(cls, d, bdddb=None, bdds=None):
         """
-        Ret the strongest elements by removing those implied by others
+        Ret the strongest elements by removing those implied by others.
+        If bdddb then check implications using bdds (the nodes of d's keys).
         """
         assert d and isinstance(d, dict)
         assert all(CC.Z3DB.maybe_expr(v) for v in d.itervalues()), d
+        assert bdddb is None or all(f in bdds for f in d), bdds
         
         def _len(e):
             #simply heuristic to try most restrict conjs first
@@ -111,7 +113,7 @@ class MinConfigs(XAnalysis):
                     return 1
 
         #sort by most restrict conj, also remove None ("true")
-        fs = sorted([f for f in d if d[f]],
+        fs = sorted([f for f in d if d[f] is not None],
                     key=lambda f: _len(d[f]), reverse=True)
 
         implied = set()
@@ -122,8 +124,11 @@ class MinConfigs(XAnalysis):
             for g in fs:
                 if f is g or g in implied:
                     continue
-                e = z3.Implies(d[f],d[g])
-                is_implied = z3util.is_tautology(e)
+                if bdddb:
+                    is_implied = bdddb.implies(bdds[f], bdds[g])
+                else:
+                    e = z3.Implies(d[f],d[g])
+                    is_implied = z3util.is_tautology(e)
                 if is_implied:
                     implied.add(g)
                 #print "{} => {} {}".format(f,g,is_implied)
@@ -131,7 +136,7 @@ class MinConfigs(XAnalysis):
         return dict((f,d[f]) for f in fs if f not in implied)
 
     @classmethod
-    def pack2(cls, fs, d):
+    def pack2(cls, fs, d, bdddb=None, bdds=None):
         assert all(isinstance(f,tuple) for f in fs),fs
         assert all(f in d and z3.is_expr(d[f]) for f in fs), (fs, d)
                    
@@ -142,11 +147,18 @@ class MinConfigs(XAnalysis):
                 continue
 
             e = z3.And(d[f],d[g])
-            if z3util.is_sat(e):
+            if bdddb:
+                e_ = bdddb.myAnd([bdds[f], bdds[g]])
+                is_sat = bdddb.is_sat(e_)
+            else:
+                is_sat = z3util.is_sat(e)
+            if is_sat:
                 packed.add(f)
                 packed.add(g)
                 fs_.append(f+g)
                 d[f+g] = e
+                if bdddb:
+                    bdds[f+g] = e_
             else:
                 d[(f,g)] = None  #cache not sat result
 
@@ -154,21 +166,24 @@ class MinConfigs(XAnalysis):
         return fs_ + fs
                 
     @classmethod
-    def pack(cls, d):
+    def pack(cls, d, bdddb=None, bdds=None):
         """
         Pack together elements that have no conflicts.
         The results are {tuple -> z3expr}
         It's good to first prune them (call prune()).
+        If bdddb then check conflicts using bdds (see prune).
         """
         assert all(z3.is_expr(v) for v in d.itervalues()), d
                        
         #change format, results are tuple(elems)
         d = dict((tuple([f]),d[f]) for f in d)
+        if bdddb:
+            bdds = dict((f, bdds[f[0]]) for f in d)
         fs = d.keys()
-        fs_ = cls.pack2(fs,d)        
+        fs_ = cls.pack2(fs,d,bdddb,bdds)
         while len(fs_) < len(fs):
             fs = fs_
-            fs_ = cls.pack2(fs,d)
+            fs_ = cls.pack2(fs,d,bdddb,bdds)
 
         fs = set(fs_)
         return dict((f,d[f]) for f in d if f in fs_)
@@ -179,14 +194,19 @@ class MinConfigs(XAnalysis):
         """
         #prune
         d = dict((c, c.z3expr(self.ld.dom, self.ld.z3db)) for c in fs)
-        d = self.prune(d)
+        if CC.use_bdd:
+            bdddb = self.ld.z3db.bdddb
+            bdds = dict((c, c.bdd(self.ld.dom, bdddb)) for c in fs)
+        else:
+            bdddb, bdds = None, None
+        d = self.prune(d, bdddb, bdds)
         logger.debug("prune: {} remains".format(len(d)))
         logger.debug("\n{}".format('\n'.join(
             "{}. {}".format(i+1,str(c)) for i,c
             in enumerate(sorted(d)))))
 
         #pack
-        d = self.pack(d)
+        d = self.pack(d, bdddb, bdds)
         logger.debug("pack: {} remains".format(len(d)))
         logger.debug("\n{}".format('\n'.join(
             "{}. {}".format(i+1, self.str_of_pack(c))
@@ -213,17 +233,21 @@ class MinConfigs(XAnalysis):
         ncovs = len(remain_covs)  #orig covs
         minset_d = CC.Configs_d()  #results
         
+        #generated configs are blocked in menum
+        menum = self.ld.dom.models_enum(self.ld.z3db)
         for pack,expr in d.iteritems():
-            #Todo: and not one of the existing ones
-            nexpr = z3util.myOr(minset_d)            
-            configs = self.ld.dom.gen_configs_exprs(
-                [expr], [nexpr], k=1, config_cls=IA.Config)
+            menum.push()
+            menum.add(expr)
+            configs = self.ld.dom.gen_configs_enum(
+                menum, k=1, config_cls=IA.Config)
+            menum.pop()
                 
             if not configs:
                 logger.warn("Cannot create configs from {}"
                             .format(self.str_of_pack(pack)))
             else:
                 config = configs[0]
+                menum.add(z3.Not(config.z3expr(self.ld.z3db)))
                 covs,xtime = f(config)
                 remain_covs = remain_covs - covs
                 minset_d[config]=covs
@@ -517,15 +541,51 @@ class Precision(XAnalysis):
     strong = 0
     equiv = 1    
     weak = 2
+
+    #exprs are z3 exprs, or BddDB nodes if CC.use_bdd 
+    def expr(self, pncore):
+        if CC.use_bdd:
+            return pncore.bdd(self.ld.dom, self.ld.z3db.bdddb)
+        else:
+            return pncore.z3expr(self.ld.dom, self.ld.z3db)
+
+    def expr_of_configs(self, configs):
+        if CC.use_bdd:
+            bdddb = self.ld.z3db.bdddb
+            return bdddb.myOr([bdddb.expr_of_dict(c) for c in configs])
+        else:
+            return z3util.myOr([c.z3expr(self.ld.z3db) for c in configs])
+
+    def neg(self, expr):
+        if CC.use_bdd:
+            return self.ld.z3db.bdddb.neg(expr)
+        else:
+            return z3.Not(expr)
+
+    def implies(self, f, g, solver):
+        if CC.use_bdd:
+            return self.ld.z3db.bdddb.implies(f, g)
+        else:
+            return z3util.is_tautology(z3.Implies(f, g), solver)
+
+    def is_equiv(self, f, g, solver):
+        if CC.use_bdd:
+            return self.ld.z3db.bdddb.equiv(f, g)
+        else:
+            return z3util.is_tautology(f == g, solver)
+
+    @staticmethod
+    def fhash(expr):
+        return expr if isinstance(expr, int) else z3util.fhash(expr)
     
     def check_existing(self):
         def check(configs, expr, cache, solver):
             #check if forall c in configs. c => expr 
-            k = hash((frozenset(configs), z3util.fhash(expr)))
+            k = hash((frozenset(configs), self.fhash(expr)))
             if k in cache: return cache[k]
 
-            rs = [config.z3expr(self.ld.z3db) for config in configs]
-            rs = z3util.is_tautology(z3.Implies(z3util.myOr(rs), expr), solver)
+            rs = self.expr_of_configs(configs)
+            rs = self.implies(rs, expr, solver)
             cache[k] = rs
             return rs
 
@@ -533,8 +593,8 @@ class Precision(XAnalysis):
         solver = self.ld.z3db.solver
         equivs, nones = IA.Mcores_d(), IA.Mcores_d()
         for pncore in self.ld.mcores_d:
-            expr = pncore.z3expr(self.ld.dom, self.ld.z3db)  #None = True
-            nexpr = expr if expr is None else z3.Not(expr)
+            expr = self.expr(pncore)  #None = True
+            nexpr = expr if expr is None else self.neg(expr)
             covs = self.ld.mcores_d[pncore]
             for cov in covs:
                 if cov not in self.ld.ncovs_d: #no neg configs for cov
@@ -556,17 +616,16 @@ class Precision(XAnalysis):
 
     def check_gt(self, cmp_dir):
         def check(configs, expr, cache, solver):
-            k = hash((frozenset(configs), z3util.fhash(expr)))
+            k = hash((frozenset(configs), self.fhash(expr)))
             if k in cache: return cache[k]
 
-            rs = [config.z3expr(self.ld.z3db) for config in configs]
-            rs = z3util.myOr(rs)  #truth
+            rs = self.expr_of_configs(configs)  #truth
             
-            if z3util.is_tautology(rs == expr, solver):
+            if self.is_equiv(rs, expr, solver):
                 stat = self.equiv
-            elif z3util.is_tautology(z3.Implies(expr, rs), solver):
+            elif self.implies(expr, rs, solver):
                 stat = self.strong
-            elif z3util.is_tautology(z3.Implies(rs, expr), solver):
+            elif self.implies(rs, expr, solver):
                 stat = self.weak
             else:
                 stat = None
@@ -581,7 +640,7 @@ class Precision(XAnalysis):
         weaks = IA.Mcores_d()
         nones = IA.Mcores_d()
         for pncore in self.ld.mcores_d:
-            expr = pncore.z3expr(self.ld.dom, self.ld.z3db)
+            expr = self.expr(pncore)
             covs = self.ld.mcores_d[pncore]
             for cov in covs:
                 if expr is None:
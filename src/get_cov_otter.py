@@ -27,23 +27,134 @@ def prepare(prog_name, get_dom_f):
     logger.debug("'{}': {} path conds ({}s)"
                  .format(pathconds_d_file,len(pathconds_d),time() - st))
 
-    args={'pathconds_d' : pathconds_d}
+    st = time()
+    index = PathcondsIndex(pathconds_d)
+    logger.debug("index {} samples ({}s)".format(len(index), time() - st))
+    
+    args={'pathconds_d' : pathconds_d, 'index': index}
     get_cov_f = lambda config: get_cov(config, args)
     return dom, get_cov_f, pathconds_d
 
+class PathcondsIndex(object):
+    """
+    Index of the samples (partial configs) of path conds.
+    A config covers the sids of a path cond if it has all settings of 
+    some sample of that path cond, so the index keeps the samples of
+    each setting and the number of settings of each sample,
+    and only checks samples having some setting of the config.
+
+    >>> s = lambda *ss: frozenset(tuple(x.split('=')) for x in ss)
+    >>> pathconds_d = {
+    ...     'p1': (set(['L1']), set([s('a=1'), s('a=0', 'b=1')])),
+    ...     'p2': (set(['L2', 'L3']), set([s('a=0', 'b=1')])),
+    ...     'p3': (set(['L4']), set([s('a=0', 'c=1')])),
+    ...     'p4': (set(['L5']), set([s()]))}
+    >>> index = PathcondsIndex(pathconds_d)
+    >>> len(index)
+    4
+    >>> print sorted(index.get_cov(IA.Config([('a', '0'), ('b', '1'), ('c', '0')])))
+    ['L1', 'L2', 'L3', 'L5']
+    >>> print sorted(index.get_cov(IA.Config([('a', '0'), ('b', '0'), ('c', '1')])))
+    ['L4', 'L5']
+
+    >>> cs = [IA.Config([('a', '0'), ('b', '1')]), IA.Config([('a', '1')])]
+    >>> print [sorted(cov) for cov in index.get_cov_many(cs + cs[:1])]
+    [['L1', 'L2', 'L3', 'L5'], ['L1', 'L5'], ['L1', 'L2', 'L3', 'L5']]
+    """
+    def __init__(self, pathconds_d):
+        sample_ids = {}
+        sample_covs = []  #sample id -> sids
+        self.nsettings = []  #sample id -> number of settings
+        self.samples_d = {}  #setting -> sample ids
+        for cov, samples in pathconds_d.itervalues():
+            for sample in samples:
+                sample = frozenset(sample)
+                try:
+                    i = sample_ids[sample]
+                except KeyError:
+                    i = sample_ids[sample] = len(sample_covs)
+                    sample_covs.append(set())
+                    self.nsettings.append(len(sample))
+                    for setting in sample:
+                        if setting in self.samples_d:
+                            self.samples_d[setting].append(i)
+                        else:
+                            self.samples_d[setting] = [i]
+                sample_covs[i].update(cov)
+
+        #samples (often) cover the same sids, store each of these once
+        covs_d = {}
+        self.covs = []
+        self.cov_ids = []  #sample id -> cov id
+        for cov in sample_covs:
+            cov = frozenset(cov)
+            if cov not in covs_d:
+                covs_d[cov] = len(self.covs)
+                self.covs.append(cov)
+            self.cov_ids.append(covs_d[cov])
+
+        #samples with no settings are covered by any config
+        self.cov_ids_0 = set(self.cov_ids[i] for i, n in 
+                             enumerate(self.nsettings) if n == 0)
+
+    def __len__(self): return len(self.nsettings)
+
+    def get_cov(self, config):
+        cov_ids = set(self.cov_ids_0)
+        counts = {}
+        for setting in config.iteritems():
+            for i in self.samples_d.get(setting, ()):
+                n = counts.get(i, 0) + 1
+                if n == self.nsettings[i]:
+                    cov_ids.add(self.cov_ids[i])
+                counts[i] = n
+
+        sids = set()
+        for i in cov_ids:
+            sids.update(self.covs[i])
+        return sids
+
+    def get_cov_many(self, configs):
+        """
+        Ret the sids of each of configs (in the same order),
+        distinct configs are evaled once
+        """
+        covs_d = {}
+        covs = []
+        for config in configs:
+            try:
+                sids = covs_d[config]
+            except KeyError:
+                sids = covs_d[config] = self.get_cov(config)
+            covs.append(set(sids))
+        return covs
+
+def get_index(args):
+    try:
+        return args['index']
+    except KeyError:
+        index = args['index'] = PathcondsIndex(args['pathconds_d'])
+        return index
+    
 def get_cov(config, args):
     if __debug__:
         assert isinstance(config,IA.Config),config
         assert isinstance(args,dict) and 'pathconds_d' in args, args
-        
-    sids = set()        
-    for cov, configs in args['pathconds_d'].itervalues():
-        if any(config.hcontent.issuperset(c) for c in configs):
-            for sid in cov:
-                sids.add(sid)
+
+    sids = get_index(args).get_cov(config)
     outps = []
     return sids,outps
 
+def get_cov_many(configs, args):
+    """
+    Like get_cov but for many configs (results are in the same order)
+    """
+    if __debug__:
+        assert all(isinstance(c, IA.Config) for c in configs), configs
+        assert isinstance(args,dict) and 'pathconds_d' in args, args
+
+    return [(sids, []) for sids in get_index(args).get_cov_many(configs)]
+
 def do_full(dom, pathconds_d, tmpdir, n=None):
     """
     Obtain interactions using Otter's pathconds
@@ -59,10 +59,13 @@ def get_run_otter(prog, args, IA, ALG_IGEN):
     sids = get_sids(args.sids)
     import get_cov_otter as Otter
     dom, get_cov_f, pathconds_d = Otter.prepare(prog, IA.Dom.get_dom)
-    igen = ALG_IGEN.IGen(dom, get_cov_f, sids)
+    igen = ALG_IGEN.IGen(dom, get_cov_f, sids, jobs=args.jobs,
+                         batch=args.batch)
     econfigs = []
+    resume = args.resume is not None
     if sids:
-        run_f = lambda seed,tdir: igen.go(seed=seed, tmpdir=tdir)
+        run_f = lambda seed,tdir: igen.go(
+            seed=seed, tmpdir=tdir, resume=resume)
             
     elif args.cmp_rand:
         #TODO: test this 
@@ -75,7 +78,8 @@ def get_run_otter(prog, args, IA, ALG_IGEN):
             n=args.rand_n if args.rand_n else None)
 
     elif args.rand_n is None:  #default
-        run_f = lambda seed,tdir: igen.go(seed=seed, tmpdir=tdir)
+        run_f = lambda seed,tdir: igen.go(
+            seed=seed, tmpdir=tdir, resume=resume)
         
     else:
         run_f = lambda seed,tdir: igen.go_rand(
@@ -83,15 +87,40 @@ def get_run_otter(prog, args, IA, ALG_IGEN):
 
     return dom, get_cov_f, run_f
 
+def get_cov_cache(args, prog_files):
+    """
+    Ret a persistent cache of config coverage if it is enabled.
+    Cached results are only valid for the same program and run script,
+    so these files (and the coverage mode) determine the cache key.
+    """
+    if not args.cov_cache:
+        return None
+
+    extra = 'outps' if CC.analyze_outps else 'sids'
+    if args.sids:  #only the covs of the src files of sids might be read
+        import get_cov
+        src_files = get_cov.get_src_files(get_sids(args.sids))
+        if src_files:
+            extra += ' ' + ' '.join(sorted(src_files))
+    if CC.mem_limit:  #might change results (timeouts are not cached)
+        extra += ' mem {}'.format(CC.mem_limit)
+    fingerprint = CC.CovCache.get_fingerprint(prog_files, extra)
+    db_file = os.path.join(igen_settings.tmp_dir, "igen_cov_cache.sqlite")
+    return CC.CovCache(db_file, fingerprint)
+
 def get_run_default(prog, args, IA, ALG_IGEN):
     sids = get_sids(args.sids)
-    dom, default_configs, get_cov_f = get_cov_default(prog, sids, args, IA)
+    dom, default_configs, get_cov_f, prog_files = get_cov_default(
+        prog, sids, args, IA)
     econfigs = [(c, None) for c in default_configs] if default_configs else []
-    igen = ALG_IGEN.IGen(dom, get_cov_f, sids)
+    cov_cache = get_cov_cache(args, prog_files)
+    igen = ALG_IGEN.IGen(dom, get_cov_f, sids, jobs=args.jobs,
+                         cov_cache=cov_cache, batch=args.batch)
+    resume = args.resume is not None
     
     if sids:
         run_f = lambda seed, tdir: igen.go(
-            seed=seed, econfigs=econfigs, tmpdir=tdir)
+            seed=seed, econfigs=econfigs, tmpdir=tdir, resume=resume)
 
     elif args.cmp_rand:
         run_f = lambda seed, tdir, rand_n: igen.go_rand(
@@ -101,7 +130,8 @@ def get_run_default(prog, args, IA, ALG_IGEN):
         run_f = lambda _,tdir: igen.go_full(tmpdir=tdir)
         
     elif args.rand_n is None:  #default
-        run_f = lambda seed, tdir: igen.go(seed=seed, econfigs=econfigs, tmpdir=tdir)
+        run_f = lambda seed, tdir: igen.go(
+            seed=seed, econfigs=econfigs, tmpdir=tdir, resume=resume)
         
     else:
         run_f = lambda seed, tdir: igen.go_rand(
@@ -118,7 +148,15 @@ def get_cov_default(prog, sids, args, IA):
 
         import get_cov
         get_cov_f = lambda config: get_cov.runscript_get_cov(
-            config, run_script)
+            config, run_script, server=args.server)
+
+        #run_script and its related files, e.g., prog.run, prog.exe
+        dir_ = os.path.dirname(run_script)
+        name_ = CM.file_basename(run_script) + '.'
+        prog_files = set(os.path.join(dir_, f) for f in os.listdir(dir_)
+                         if f.startswith(name_))
+        prog_files = [f for f in prog_files | set([run_script])
+                      if os.path.isfile(f)]
     else:
         import igen_settings
         import get_cov_coreutils as Coreutils
@@ -128,9 +166,17 @@ def get_cov_default(prog, sids, args, IA):
             IA.Dom.get_dom,
             igen_settings.coreutils_main_dir,
             igen_settings.coreutils_doms_dir,
-            do_perl=args.do_perl)
+            do_perl=args.do_perl,
+            sids=sids,
+            ts_jobs=args.ts_jobs)
+
+        prog_files = [Coreutils.__file__.replace('.pyc', '.py')]
+        if not args.do_perl:
+            prog_files.append(os.path.join(
+                igen_settings.coreutils_main_dir,
+                'coreutils', 'obj-gcov', 'src', prog))
 
-    return dom, default_configs, get_cov_f
+    return dom, default_configs, get_cov_f, prog_files
 
 def get_run_f(prog, args, logger):
     """
@@ -147,6 +193,58 @@ def get_run_f(prog, args, logger):
     logger.debug("dom:\n{}".format(dom))
     return run_f, get_cov_f
 
+def benchmark(progs, args, seed, logger):
+    """
+    Run each prog in progs args.benchmark times (seeds seed, seed + 1, ..)
+    and ret the results dirs of progs, which contain the runN_ dirs.
+    The runs are independent and up to args.cores // args.jobs of them 
+    run at once (each uses args.jobs processes to eval configs).
+    """
+    tdirs, runs = [], []
+    for prog in progs:
+        prog_name = prog if prog else 'noname'
+        prefix = "igen_{}_{}_{}_".format(
+            args.benchmark, 'full' if args.do_full else 'normal', prog_name)
+        tdir = tempfile.mkdtemp(dir=igen_settings.tmp_dir, prefix=prefix)
+        tdirs.append(tdir)
+        logger.debug("* benchmark '{}', {} runs, seed {}, results '{}'"
+                     .format(prog_name, args.benchmark, seed, tdir))
+        for i in range(args.benchmark):
+            tdir_ = tempfile.mkdtemp(dir=tdir, prefix="run{}_".format(i))
+            runs.append((prog, i, seed + i, tdir_))
+
+    def run((prog, i, seed_, tdir_), run_f):
+        st_ = time()
+        logger.debug("*run {}/{}".format(i+1, args.benchmark))
+        _ = run_f(seed_, tdir_)
+        logger.debug("*run {}, seed {}, time {}s, '{}'".format(
+            i + 1, seed_, time() - st_, tdir_))
+
+    nprocs = max(1, args.cores // args.jobs)
+    if nprocs == 1 or len(runs) == 1:
+        run_fs = {}
+        for r in runs:
+            prog = r[0]
+            if prog not in run_fs:
+                run_fs[prog], _ = get_run_f(prog, args, logger)
+            run(r, run_fs[prog])
+    else:
+        #each run process creates its own run_f (e.g., its cov cache conn)
+        logger.debug("* {} runs, {} at once".format(len(runs), nprocs))
+        def f(r):
+            import get_cov
+            try:
+                run(r, get_run_f(r[0], args, logger)[0])
+            finally:  #prun processes exit without atexit funcs
+                get_cov.cleanup()
+        codes = CM.prun(f, runs, nprocs)
+        fails = [r[-1] for r, code in zip(runs, codes) if code]
+        if fails:
+            logger.error("{} runs failed: {}".format(
+                len(fails), ', '.join(fails)))
+
+    return tdirs
+
 
 if __name__ == "__main__":
 
@@ -155,7 +253,8 @@ if __name__ == "__main__":
     igen_dir = os.path.dirname(igen_file)
         
     aparser = argparse.ArgumentParser("iGen (dynamic interaction generator)")
-    aparser.add_argument("inp", help="inp", nargs='?') 
+    aparser.add_argument("inp", help="inp (progs to benchmark or a dir)",
+                         nargs='*')
     
     #0 Error #1 Warn #2 Info #3 Debug #4 Detail
     aparser.add_argument("--logger_level", "-logger_level",
@@ -185,6 +284,16 @@ if __name__ == "__main__":
                          help="analyze outputs instead of coverage",
                          action="store_true")
 
+    aparser.add_argument("--rand_cex", "-rand_cex",
+                         help=("create cex configs by randomly completing "
+                               "cores instead of using a solver"),
+                         action="store_true")
+
+    aparser.add_argument("--bdd", "-bdd",
+                         help=("check interactions using decision diagrams "
+                               "instead of z3"),
+                         action="store_true")
+
     aparser.add_argument("--allows_known_errors", "-allows_known_errors",
                          help="allows for potentially no coverage exec",
                          action="store_true")
@@ -194,6 +303,40 @@ if __name__ == "__main__":
                          default=1,
                          help="benchmark program n times")
 
+    aparser.add_argument("--jobs", "-jobs",
+                         type=lambda v: check_range(v, min_n=1),
+                         default=1,
+                         help="eval configs and infer results using n processes")
+
+    aparser.add_argument("--batch", "-batch",
+                         type=lambda v: check_range(v, min_n=1),
+                         default=1,
+                         help=("select n cores per iter and eval "
+                               "their cex configs together"))
+
+    aparser.add_argument("--ts_jobs", "-ts_jobs",
+                         type=lambda v: check_range(v, min_n=1),
+                         default=1,
+                         help=("run up to n cmds of a coreutils testsuite "
+                               "at once"))
+
+    aparser.add_argument("--cores", "-cores",
+                         type=lambda v: check_range(v, min_n=1),
+                         default=1,
+                         help=("use n processes in total, i.e., run up to "
+                               "n / jobs benchmark runs at once"))
+
+    aparser.add_argument("--resume", "-resume",
+                         help=("continue the interrupted run in this dir "
+                               "after its last complete iter"),
+                         action="store",
+                         default=None,
+                         type=str)
+
+    aparser.add_argument("--cov_cache", "-cov_cache",
+                         help="reuse coverage of configs from previous runs",
+                         action="store_true")
+
     aparser.add_argument("--dom_file", "-dom_file",
                          "--domain", "-domain",
                          help="file containing config domains",
@@ -204,6 +347,26 @@ if __name__ == "__main__":
                          help="script to obtain the program's coverage",
                          action="store")
 
+    aparser.add_argument("--server", "-server",
+                         help=("start run_script once and "
+                               "send it configs via stdin"),
+                         action="store_true")
+
+    aparser.add_argument("--timeout", "-timeout",
+                         type=lambda v: check_range(v, min_n=1),
+                         help=("kill a run of the prog after n secs, "
+                               "configs whose runs are killed (or exceed "
+                               "-cpu_limit, -mem_limit) cover '{}'"
+                               .format(CC.timeout_sid)))
+
+    aparser.add_argument("--cpu_limit", "-cpu_limit",
+                         type=lambda v: check_range(v, min_n=1),
+                         help="limit a run of the prog to n cpu secs")
+
+    aparser.add_argument("--mem_limit", "-mem_limit",
+                         type=lambda v: check_range(v, min_n=1),
+                         help="limit a run of the prog to n MB of memory")
+
     aparser.add_argument("--do_perl", "-do_perl",
                          help="do coretutils written in Perl",
                          action="store_true")
@@ -265,6 +428,16 @@ if __name__ == "__main__":
     if args.allows_known_errors: CC.allows_known_errors = True
     if args.noshow_cov: CC.show_cov = False
     if args.analyze_outps: CC.analyze_outps = True
+    if args.rand_cex: CC.rand_cex = True
+    if args.bdd: CC.use_bdd = True
+    CC.timeout = args.timeout
+    CC.cpu_limit = args.cpu_limit
+    CC.mem_limit = args.mem_limit
+    if args.server and (CC.timeout or CC.cpu_limit or CC.mem_limit):
+        logger.warn("limits are not used for the run_script server")
+    if args.dom_file and not args.server and (args.jobs > 1 or args.cores > 1):
+        logger.warn("run_script runs are serialized unless the run_script "
+                    "writes its cov file to $IGEN_COV_FILE (or uses -server)")
         
     seed = round(time(), 2) if args.seed is None else float(args.seed)
     
@@ -272,37 +445,49 @@ if __name__ == "__main__":
     # 1. run iGen to find interactions and
     # 2. run Analysis to analyze iGen's generated files    
     analysis_f = None
-    if args.inp and os.path.isdir(args.inp):
+    if len(args.inp) == 1 and os.path.isdir(args.inp[0]):
         from analysis import Analysis
-        dirstat = Analysis.get_dir_stat(args.inp)
+        dirstat = Analysis.get_dir_stat(args.inp[0])
         if dirstat == Analysis.RUNDIR:
             analysis_f = Analysis.replay
         elif dirstat == Analysis.BENCHMARKDIR:
             analysis_f = Analysis.replay_dirs
                 
     if not analysis_f: #run iGen
-        prog = args.inp
-        run_f, get_cov_f = get_run_f(prog, args, logger)
-
-        prog_name = prog if prog else 'noname'
-        prefix = "igen_{}_{}_{}_".format(
-            args.benchmark, 'full' if args.do_full else 'normal', prog_name)
-        tdir = tempfile.mkdtemp(dir=igen_settings.tmp_dir, prefix=prefix)
-
-        logger.debug("* benchmark '{}', {} runs, seed {}, results '{}'"
-                     .format(prog_name, args.benchmark, seed, tdir))
-        st = time()
-        for i in range(args.benchmark):        
-            st_ = time()
-            seed_ = seed + i
-            tdir_ = tempfile.mkdtemp(dir=tdir, prefix="run{}_".format(i))
-            logger.debug("*run {}/{}".format(i+1, args.benchmark))
-            _ = run_f(seed_, tdir_)
-            logger.debug("*run {}, seed {}, time {}s, '{}'".format(
-                i + 1, seed_, time() - st_, tdir_))
-
-        logger.info("** done {} runs, seed {}, time {}, results '{}'"
-                    .format(args.benchmark, seed, time() - st, tdir))
+        progs = args.inp if args.inp else [None]
+
+        if args.resume:  #same seed and results dir as the interrupted run
+            from alg import DTrace
+            assert len(progs) == 1, "resume one prog"
+            prog = progs[0]
+            prog_name = prog if prog else 'noname'
+            run_f, _ = get_run_f(prog, args, logger)
+            tdir = CM.getpath(args.resume)
+            assert os.path.isfile(os.path.join(tdir, 'state')), \
+                "'{}' has no complete iter to resume".format(tdir)
+            assert args.benchmark == 1 and args.rand_n is None and \
+                not args.do_full, "resume only normal (CEGIR) runs"
+            seed, _ = DTrace.load_pre(tdir)
+            logger.debug("* resume '{}', seed {}, results '{}'"
+                         .format(prog_name, seed, tdir))
+            st = time()
+            _ = run_f(seed, tdir)
+            logger.info("** done resume, seed {}, time {}, results '{}'"
+                        .format(seed, time() - st, tdir))
+        else:
+            st = time()
+            tdirs = benchmark(progs, args, seed, logger)
+            for tdir in tdirs:
+                logger.info("** done {} runs, seed {}, time {}, results '{}'"
+                            .format(args.benchmark, seed, time() - st, tdir))
+
+            if args.benchmark > 1:  #summary of the runs of each prog
+                from analysis import Analysis
+                for tdir in tdirs:
+                    Analysis.replay_dirs(
+                        tdir, show_iters=False, do_minconfigs=None,
+                        do_influence=False, do_evolution=False,
+                        do_precision=False, cmp_rand=None, cmp_dir=None)
                             
     else: #run analysis
         do_minconfigs = args.minconfigs  
@@ -318,7 +503,7 @@ if __name__ == "__main__":
             cmp_rand = lambda tseed, rand_n: run_f(tseed, tdir, rand_n)
 
         cmp_dir = args.cmp_dir
-        analysis_f(args.inp,
+        analysis_f(args.inp[0],
                    show_iters=args.show_iters,
                    do_minconfigs=do_minconfigs,
                    do_influence=args.influence,
@@ -552,10 +552,8 @@ def get_models(f,k):
     s.add(f)
 
     models = []
-    i = 0
-    while s.check() == sat and i < k:
-        i = i + 1
-
+    stat = s.check()
+    while stat == sat and len(models) < k:
         m = s.model()
 
         if not m: #if m == []
@@ -563,20 +561,140 @@ def get_models(f,k):
 
         models.append(m)
 
-
         #create new constraint to block the current model
         block = Not(And([v() == m[v] for v in m]))
         s.add(block)
+        stat = s.check()
 
-
-    if s.check() == unknown:
+    if stat == unknown:
         return None
-    elif s.check() == unsat and i==0:
+    elif stat == unsat and not models:
         return False
     else:
         return models
 
 
+class ModelEnum(object):
+    """
+    Enumerate models using a single (incremental) solver.
+
+    Each model is projected on the variables vs (default: the variables
+    in the model) and then blocked, so that the next models differ on vs.
+    Variables in vs that the model does not assign (i.e., they can take
+    any value) are given the values of complete_f(v) (default: z3's 
+    model completion).  The result of the last check is cached.
+
+    EXAMPLES:
+
+    >>> from z3 import *
+    >>> x, y = Ints('x y')
+    >>> me = ModelEnum(And(0 <= x, x <= 4, 0 <= y, y <= 4), vs=[x])
+    >>> rs = me.get(3)
+    >>> len(rs), len(set(str(a[0][1]) for a in rs))
+    (3, 3)
+    >>> len(me.get(10))
+    2
+    >>> me.get(1)
+    False
+
+    >>> me = ModelEnum(And(0 <= x, x <= 4))
+    >>> me.push()
+    >>> me.add(x >= 4)
+    >>> print me.get(2)
+    [[(x, 4)]]
+    >>> me.pop()  #also removes the blocking of x == 4
+    >>> len(me.get(10))
+    5
+
+    >>> b = Bool('b')
+    >>> ModelEnum(Implies(b,b)).get(1)
+    []
+    >>> ModelEnum(Implies(b,b), vs=[b], complete_f=lambda v: TRUE).get(3)
+    [[(b, True)], [(b, False)]]
+
+    get(k) checks the solver (at most) k times
+    >>> me = ModelEnum(And(0 <= x, x <= 4))
+    >>> checks = []
+    >>> check = me.solver.check
+    >>> me.solver.check = lambda: checks.append(1) or check()
+    >>> len(me.get(1)), len(me.get(1)), len(checks)
+    (1, 1, 2)
+    """
+    def __init__(self, f=None, vs=None, complete_f=None):
+        assert vs is None or all(is_const(v) for v in vs), vs
+        assert complete_f is None or callable(complete_f), complete_f
+        
+        self.solver = Solver()
+        self.vs = vs
+        self.complete_f = complete_f
+        self._stat = None
+        if f is not None:
+            self.add(f)
+
+    def add(self, f):
+        assert is_expr(f), f
+        self.solver.add(f)
+        self._stat = None
+
+    def push(self):
+        self.solver.push()
+
+    def pop(self):
+        self.solver.pop()
+        self._stat = None
+
+    def check(self):
+        if self._stat is None:
+            self._stat = self.solver.check()
+        return self._stat
+
+    def get_assignment(self, m):
+        if self.vs is None:
+            return [(v(), m[v]) for v in m]
+
+        rs = []
+        for v in self.vs:
+            val = m[v]
+            if val is None:
+                val = (self.complete_f(v) if self.complete_f
+                       else m.eval(v, model_completion=True))
+            rs.append((v, val))
+        return rs
+        
+    def get(self, k):
+        """
+        Returns at most k new models, each is a list of (var, val).
+        If there are no (more) models, returns False.
+        If the constraints cannot be solved (and no models are found), 
+        returns None.
+        """
+        assert k >= 1, k
+
+        models = []
+        stat = None
+        while len(models) < k:
+            stat = self.check()
+            if stat != sat:
+                break
+            
+            a = self.get_assignment(self.solver.model())
+            if not a:  #tautology
+                break
+
+            models.append(a)
+            self.add(Not(And([v == val for v, val in a])))
+
+        #the found models are blocked, so ret them even if the last
+        #check is unknown
+        if models:
+            return models
+        elif stat == unknown:
+            return None
+        elif stat == unsat:
+            return False
+        else:
+            return models
+
 
 def exact_one_model(f):
     """